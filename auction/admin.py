@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Player, Team, Auction
+from .models import Player, Team, Auction, Bid
 
 admin.site.register(Player)
 admin.site.register(Team)
 admin.site.register(Auction)
+admin.site.register(Bid)
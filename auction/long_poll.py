@@ -0,0 +1,53 @@
+"""
+Room-state long-polls held in front of Django: GET /api/room-state/<code>/?since=&wait=
+
+Django's ASGI handler gives every request a thread of its own before the
+view runs, so a long-poll that waits inside the view pins that thread for
+the whole wait. auction_web/asgi.py routes long-polls through
+hold_long_poll() first; the request then reaches Django without ?wait and
+is answered at once.
+"""
+
+import re
+from urllib.parse import parse_qsl, urlencode
+
+from .services.broadcast import get_broadcast
+from .views import LONG_POLL_MAX_WAIT, wait_for_room_change
+
+ROOM_STATE_PATH = re.compile(r"^/api/room-state/(?P<code>[^/]+)/$")
+
+
+def _long_poll(scope):
+    """(code, since, wait) if the request is a long-poll, else None"""
+    if scope["type"] != "http" or scope["method"] != "GET":
+        return None
+    match = ROOM_STATE_PATH.match(scope["path"])
+    if not match:
+        return None
+    query = dict(parse_qsl(scope.get("query_string", b"").decode()))
+    try:
+        since = int(query.get("since", -1))
+        wait = min(float(query.get("wait", 0)), LONG_POLL_MAX_WAIT)
+    except ValueError:
+        return None  # The view answers with the 400
+    if wait <= 0:
+        return None
+    return match.group("code"), since, wait
+
+
+async def hold_long_poll(scope):
+    """Wait out a long-poll request; returns the scope to hand to Django"""
+    long_poll = _long_poll(scope)
+    if long_poll is None:
+        return scope
+
+    code, since, wait = long_poll
+    get_broadcast()  # Make sure this process hears other workers' changes
+    await wait_for_room_change(code, since, wait)
+
+    query = [
+        (name, value)
+        for name, value in parse_qsl(scope["query_string"].decode(), keep_blank_values=True)
+        if name != "wait"
+    ]
+    return dict(scope, query_string=urlencode(query).encode())
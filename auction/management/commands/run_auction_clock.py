@@ -0,0 +1,33 @@
+"""
+Django management command that settles auction lots when their timers expire
+Usage: python manage.py run_auction_clock [--rescan 1.0] [--once]
+"""
+
+from django.core.management.base import BaseCommand
+
+from auction.services.auction_clock import AuctionClock, settle_due_rooms
+
+
+class Command(BaseCommand):
+    help = 'Run the auction clock (settles SOLD/UNSOLD and moves to the next player)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rescan', type=float, default=1.0,
+            help='Seconds between reloads of live room deadlines (default 1.0)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Settle whatever is due right now and exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            settled = settle_due_rooms()
+            self.stdout.write(f"Checked {settled} due room(s)")
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Auction clock running (rescan every {options['rescan']}s)"
+        ))
+        AuctionClock(rescan_seconds=options['rescan']).run_forever()
@@ -0,0 +1,76 @@
+"""
+Request latency sampling for the poll hints (views.next_poll_ms).
+
+Each worker keeps a moving average of how long it takes to answer a
+request in metrics ("request_latency_ms"). Long-polls and event streams
+are left out - they are slow on purpose.
+
+Also home to StaticFilesMiddleware, an async-capable WhiteNoise.
+"""
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .services import metrics
+
+
+def _record(request, response, started):
+    if response.streaming or request.GET.get("wait"):
+        return
+    metrics.observe("request_latency_ms", (time.perf_counter() - started) * 1000)
+
+
+class RequestLatencyMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        _record(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        _record(request, response, started)
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise is sync-only, and one sync middleware makes Django run every
+    async view (long-polls included) on a thread. Serve files the same way
+    but pass other requests on without leaving the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
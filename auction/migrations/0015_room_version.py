@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0014_auctionlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
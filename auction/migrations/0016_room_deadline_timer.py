@@ -0,0 +1,55 @@
+# Replace the relative timer (timer + last_timer_update) with an absolute deadline
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def forwards(apps, schema_editor):
+    Room = apps.get_model('auction', 'Room')
+    for room in Room.objects.all():
+        if room.is_paused:
+            room.paused_remaining = float(room.timer)
+        elif room.last_timer_update:
+            room.deadline_at = room.last_timer_update + timedelta(seconds=room.timer)
+        room.save(update_fields=['deadline_at', 'paused_remaining'])
+
+
+def backwards(apps, schema_editor):
+    Room = apps.get_model('auction', 'Room')
+    for room in Room.objects.all():
+        if room.paused_remaining is not None:
+            room.timer = int(room.paused_remaining)
+        elif room.deadline_at:
+            room.timer = room.default_timer_duration
+            room.last_timer_update = room.deadline_at - timedelta(seconds=room.timer)
+        room.save(update_fields=['timer', 'last_timer_update'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0015_room_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='deadline_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='paused_remaining',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(
+            model_name='room',
+            name='last_timer_update',
+        ),
+        migrations.RemoveField(
+            model_name='room',
+            name='timer',
+        ),
+    ]
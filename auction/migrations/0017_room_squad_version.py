@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0016_room_deadline_timer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='squad_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
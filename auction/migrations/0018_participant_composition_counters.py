@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+def role_field(role):
+    # Same buckets as team_evaluator.role_category, frozen for this migration
+    role = role.upper()
+    if "WICKET KEEPER" in role or "WK" in role:
+        return "wicket_keeper_count"
+    if "ALL ROUNDER" in role:
+        return "all_rounder_count"
+    if "BOWLER" in role:
+        return "bowler_count"
+    return "batsman_count"
+
+
+def backfill_counters(apps, schema_editor):
+    """Count each participant's finalized purchases into the new counters"""
+    Auction = apps.get_model('auction', 'Auction')
+    Participant = apps.get_model('auction', 'Participant')
+
+    counters = {}
+    purchases = Auction.objects.filter(is_finalized=True, team__isnull=False).values_list(
+        'room_id', 'team__name', 'player__role', 'player__country'
+    )
+    for room_id, team, role, country in purchases:
+        counts = counters.setdefault((room_id, team), {
+            "squad_count": 0, "overseas_count": 0, "batsman_count": 0, "bowler_count": 0,
+            "all_rounder_count": 0, "wicket_keeper_count": 0,
+        })
+        counts["squad_count"] += 1
+        counts["overseas_count"] += country.lower() != "india"
+        counts[role_field(role)] += 1
+
+    for participant in Participant.objects.all():
+        counts = counters.get((participant.room_id, participant.team))
+        if counts:
+            Participant.objects.filter(pk=participant.pk).update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0017_room_squad_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='overseas_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='batsman_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='bowler_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='all_rounder_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='wicket_keeper_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
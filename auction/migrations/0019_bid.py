@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0018_participant_composition_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team', models.CharField(max_length=10)),
+                ('amount', models.IntegerField()),
+                ('placed_at', models.DateTimeField()),
+                ('sequence', models.PositiveIntegerField()),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bids', to='auction.player')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bids', to='auction.room')),
+            ],
+            options={
+                'ordering': ['sequence'],
+                'indexes': [models.Index(fields=['room', 'player'], name='auction_bid_room_id_04a7f9_idx')],
+                'constraints': [models.UniqueConstraint(fields=('room', 'sequence'), name='unique_bid_sequence_per_room')],
+            },
+        ),
+    ]
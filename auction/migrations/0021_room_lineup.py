@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_lineups(apps, schema_editor):
+    """Give rooms that already started the default lineup, positioned at their current player"""
+    Player = apps.get_model('auction', 'Player')
+    Room = apps.get_model('auction', 'Room')
+    RoomLineup = apps.get_model('auction', 'RoomLineup')
+
+    player_ids = list(Player.objects.order_by('set_no', 'id').values_list('id', flat=True))
+    for room in Room.objects.filter(current_player__isnull=False):
+        RoomLineup.objects.create(room=room, player_ids=player_ids)
+        if room.current_player_id in player_ids:
+            Room.objects.filter(pk=room.pk).update(lineup_position=player_ids.index(room.current_player_id))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0020_proxybid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='lineup_position',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='RoomLineup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('player_ids', models.JSONField(default=list)),
+                ('room', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='lineup', to='auction.room')),
+            ],
+        ),
+        migrations.RunPython(backfill_lineups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0021_room_lineup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['set_no', 'id'], name='player_set_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['created_at', 'is_public', 'status'], name='room_lobby_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['room', 'is_qualified', 'final_score'], name='participant_ranking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['room', 'team', 'is_finalized'], name='auction_room_team_final_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['room', 'status'], name='auction_room_status_idx'),
+        ),
+    ]
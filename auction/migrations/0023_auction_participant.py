@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_participants(apps, schema_editor):
+    """Point every purchase at the room's participant playing that team"""
+    Auction = apps.get_model('auction', 'Auction')
+    Participant = apps.get_model('auction', 'Participant')
+
+    participants = {
+        (room_id, team): pk for pk, room_id, team in Participant.objects.values_list('pk', 'room_id', 'team')
+    }
+    purchases = list(Auction.objects.filter(team__isnull=False).select_related('team'))
+    for purchase in purchases:
+        purchase.participant_id = participants.get((purchase.room_id, purchase.team.name))
+    Auction.objects.bulk_update(
+        [purchase for purchase in purchases if purchase.participant_id], ['participant'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0022_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='participant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='purchases', to='auction.participant'),
+        ),
+        migrations.RunPython(backfill_participants, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='auction',
+            name='auction_room_team_final_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['room', 'participant', 'is_finalized'], name='auction_room_buyer_final_idx'),
+        ),
+    ]
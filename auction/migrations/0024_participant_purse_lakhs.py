@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:30
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def budget_to_lakhs(apps, schema_editor):
+    """Crore budgets become integer-lakh purses; spent is summed from purchases"""
+    Participant = apps.get_model('auction', 'Participant')
+    Auction = apps.get_model('auction', 'Auction')
+
+    spent = dict(
+        Auction.objects.filter(is_finalized=True, participant__isnull=False)
+        .values_list('participant').annotate(total=Sum('price'))
+    )
+    participants = list(Participant.objects.all())
+    for participant in participants:
+        participant.purse = int((participant.budget * 100).to_integral_value())
+        participant.spent = spent.get(participant.pk) or 0
+    Participant.objects.bulk_update(participants, ['purse', 'spent'], batch_size=500)
+
+
+def purse_to_crores(apps, schema_editor):
+    Participant = apps.get_model('auction', 'Participant')
+    participants = list(Participant.objects.all())
+    for participant in participants:
+        participant.budget = Decimal(participant.purse) / 100
+    Participant.objects.bulk_update(participants, ['budget'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0023_auction_participant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='purse',
+            field=models.IntegerField(default=12000),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='spent',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(budget_to_lakhs, purse_to_crores),
+        migrations.RemoveField(
+            model_name='participant',
+            name='budget',
+        ),
+    ]
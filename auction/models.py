@@ -1,6 +1,13 @@
+from decimal import Decimal
+
 from django.db import models
 
 
+def lakhs_to_crores(lakhs):
+    """Integer lakhs -> the crore amount the API shows (1 Cr = 100 L)"""
+    return (Decimal(lakhs) / 100).quantize(Decimal("0.01"))
+
+
 class Player(models.Model):
     name = models.CharField(max_length=100)
     role = models.CharField(max_length=20)  # Specialism (BOWLER, BAT, etc.)
@@ -21,6 +28,11 @@ class Player(models.Model):
     wickets = models.IntegerField(default=0)
     economy = models.FloatField(default=0.0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['set_no', 'id'], name='player_set_order_idx'),  # Auction order
+        ]
+
     def __str__(self):
         return self.name
 
@@ -57,11 +69,12 @@ class Room(models.Model):
         null=True,
         blank=True
     )
+    lineup_position = models.IntegerField(default=0)  # Index of current_player in lineup.player_ids
     
-    # Server-side timer state
+    # Server-side timer state - absolute deadline, so reads never write
     default_timer_duration = models.IntegerField(default=15)  # Global setting for timer
-    timer = models.IntegerField(default=15)  # seconds
-    last_timer_update = models.DateTimeField(null=True, blank=True)
+    deadline_at = models.DateTimeField(null=True, blank=True)  # When the running lot's clock hits 0
+    paused_remaining = models.FloatField(null=True, blank=True)  # Seconds left, frozen while paused
     
     # Current bid tracking
     current_bid = models.IntegerField(default=0)
@@ -73,19 +86,48 @@ class Room(models.Model):
     sold_team = models.CharField(max_length=10, null=True, blank=True)  # Team that purchased (for SOLD)
     sold_price = models.IntegerField(null=True, blank=True)  # Final sale price (for SOLD)
 
+    # Monotonic state version - bumped on every mutation (used for ETags)
+    version = models.PositiveIntegerField(default=0)
+    squad_version = models.PositiveIntegerField(default=0)  # Bumped when a player is sold
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'is_public', 'status'], name='room_lobby_idx'),  # Active rooms
+        ]
+
     def __str__(self):
         return self.code
 
 
 
+class RoomLineup(models.Model):
+    """Order in which a room auctions its players - fixed when the auction starts"""
+    room = models.OneToOneField(Room, on_delete=models.CASCADE, related_name="lineup")
+    player_ids = models.JSONField(default=list)
+
+    def __str__(self):
+        return f"[{self.room_id}] {len(self.player_ids)} players"
+
+
 class Participant(models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="participants")
     username = models.CharField(max_length=100)
     team = models.CharField(max_length=10)
     is_host = models.BooleanField(default=False)
 
-    budget = models.DecimalField(max_digits=6, decimal_places=2, default=120.00)  # Budget in Crores with decimals
+    # Purse in integer lakhs: what is left and what has been spent. Only
+    # changed by guarded F() updates (room_ops.record_sale)
+    purse = models.IntegerField(default=12000)  # 120 Cr
+    spent = models.IntegerField(default=0)
     squad_count = models.IntegerField(default=0)
+
+    # Squad composition, kept in step with squad_count when a lot is sold
+    # (room_ops.record_sale) so bid checks don't have to count purchases
+    overseas_count = models.IntegerField(default=0)
+    batsman_count = models.IntegerField(default=0)
+    bowler_count = models.IntegerField(default=0)
+    all_rounder_count = models.IntegerField(default=0)
+    wicket_keeper_count = models.IntegerField(default=0)
     
     # Post-Auction Fields
     playing_xi = models.ManyToManyField(Player, blank=True, related_name="selected_by")
@@ -94,6 +136,14 @@ class Participant(models.Model):
 
     class Meta:
         unique_together = ("room", "team")
+        indexes = [
+            models.Index(fields=['room', 'is_qualified', 'final_score'], name='participant_ranking_idx'),  # Winner
+        ]
+
+    @property
+    def budget(self):
+        """Remaining purse in Crores"""
+        return lakhs_to_crores(self.purse)
 
     def __str__(self):
         return f"{self.username} ({self.team})"
@@ -104,14 +154,60 @@ class Participant(models.Model):
 class Auction(models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE)
     player = models.ForeignKey(Player, on_delete=models.CASCADE)
+    # Buyer within the room; `team` is the legacy global link, no longer written
+    participant = models.ForeignKey(
+        Participant, on_delete=models.CASCADE, null=True, blank=True, related_name="purchases"
+    )
     team = models.ForeignKey(Team, on_delete=models.CASCADE, null=True, blank=True)
     price = models.IntegerField(null=True, blank=True)
     is_finalized = models.BooleanField(default=False)  # True only when process is done
     status = models.CharField(max_length=20, default='SOLD') # SOLD, UNSOLD, SKIPPED
     sold_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'participant', 'is_finalized'], name='auction_room_buyer_final_idx'),  # Squads
+            models.Index(fields=['room', 'status'], name='auction_room_status_idx'),  # Unsold players
+        ]
+
+    def __str__(self):
+        buyer = self.participant.team if self.participant_id else self.team  # Legacy rows: team
+        return f"{self.player} -> {buyer} for {self.price}"
+
+class Bid(models.Model):
+    """Accepted bid - append-only price-discovery history (written in batches by services.bid_ledger)"""
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="bids")
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="bids")
+    team = models.CharField(max_length=10)
+    amount = models.IntegerField()  # In Lakhs
+    placed_at = models.DateTimeField()  # When the server accepted the bid
+    sequence = models.PositiveIntegerField()  # Room version the bid produced
+
+    class Meta:
+        ordering = ['sequence']
+        indexes = [models.Index(fields=['room', 'player'])]
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'sequence'], name='unique_bid_sequence_per_room'),
+        ]
+
+    def __str__(self):
+        return f"[{self.room_id}#{self.sequence}] {self.team} {self.amount}L for {self.player_id}"
+
+
+class ProxyBid(models.Model):
+    """Hidden maximum a team will pay for a player - bid on its behalf by services.proxy_bidding"""
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="proxy_bids")
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="proxy_bids")
+    team = models.CharField(max_length=10)
+    max_amount = models.IntegerField()  # In Lakhs
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("room", "player", "team")
+
     def __str__(self):
-        return f"{self.player} -> {self.team} for {self.price}"
+        return f"[{self.room_id}] {self.team} up to {self.max_amount}L for {self.player_id}"
+
 
 class Vote(models.Model):
    voter = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name="votes_cast")
@@ -0,0 +1,183 @@
+"""
+Auction clock - settles lots when their timers run out.
+
+Timer expiry used to be a side effect of whichever room-state poll arrived
+first, so several workers raced to settle the same lot. Now one clock
+process (manage.py run_auction_clock) keeps every live room's next deadline
+in a priority queue and settles each lot when it is due:
+
+    timer hits 0         -> mark SOLD / UNSOLD (shown for 1 second)
+    1 second after that  -> finalize the Auction record, charge the buyer,
+                            move to the next player
+
+settle_room() locks the room row and re-checks the deadline, so a stale
+queue entry or a second clock instance can never settle a lot twice. A host
+who clicks Sell while a result is on screen settles that same result
+(finalize_result) under the same lock instead of selling the lot again.
+"""
+
+import heapq
+import logging
+import time
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from ..models import Auction, Room
+from .broadcast import publish
+from .proxy_bidding import resolve_proxies
+from .room_ops import add_log, lock_room, move_to_next_player, record_sale, save_room
+
+logger = logging.getLogger(__name__)
+
+RESULT_DISPLAY_SECONDS = 1  # How long SOLD/UNSOLD/SKIPPED stays on screen
+
+
+def room_deadline(room):
+    """When the room next needs settling (None while the clock is stopped)"""
+    if not (room.is_live and not room.is_paused and room.deadline_at):
+        return None
+    if room.sold_status and room.sold_at:
+        return room.sold_at + timedelta(seconds=RESULT_DISPLAY_SECONDS)
+    return room.deadline_at
+
+
+def _mark_result(room):
+    """Timer just hit 0 - mark as SOLD or UNSOLD (don't move to next player yet!)"""
+    if room.highest_bidder:
+        room.sold_status = 'SOLD'
+        room.sold_team = room.highest_bidder
+        room.sold_price = room.current_bid
+    else:
+        room.sold_status = 'UNSOLD'
+        room.sold_team = None
+        room.sold_price = None
+
+    room.sold_at = timezone.now()
+    save_room(room)
+    publish(room.code, room.sold_status.lower(), {
+        "player": room.current_player.name,
+        "team": room.sold_team,
+        "price": room.sold_price
+    })
+
+
+def finalize_result(room):
+    """
+    Result has been shown - record it and move to the next player.
+    Call with the room row locked. Returns False when the lineup is done.
+    """
+    if room.sold_status == 'SOLD' and not record_sale(room, room.sold_team, room.sold_price):
+        room.sold_status = 'UNSOLD'  # The purse no longer covers the price
+    if room.sold_status == 'SOLD':
+        price_fmt = f"₹{room.sold_price/100} Cr" if room.sold_price >= 100 else f"₹{room.sold_price}L"
+        add_log(room, f"🏆 {room.current_player.name} SOLD to {room.sold_team} for {price_fmt}!")
+    else:
+        # ✅ CREATE FINALIZED Auction record for UNSOLD/SKIPPED
+        Auction.objects.create(
+            room=room,
+            player=room.current_player,
+            participant=None,
+            price=None,
+            is_finalized=True,
+            status=room.sold_status
+        )
+        if room.sold_status == 'UNSOLD':
+            add_log(room, f"❌ {room.current_player.name} went UNSOLD")
+        elif room.sold_status == 'SKIPPED':
+            add_log(room, f"⏭️ {room.current_player.name} SKIPPED")
+
+    # Move to next player (whether sold, unsold, or skipped) - clears the result
+    has_next = move_to_next_player(room)
+    if has_next and resolve_proxies(room):
+        room.refresh_from_db()  # Proxies for the new player already bid and restarted its clock
+    return has_next
+
+
+def settle_room(code):
+    """
+    Apply whatever timer work is due for a room, exactly once.
+    Returns the room's next deadline (None if its clock is stopped).
+    """
+    with transaction.atomic():
+        room = lock_room(code)
+        if room is None:
+            return None
+
+        deadline = room_deadline(room)
+        if deadline is None or deadline > timezone.now():
+            return deadline  # Not due (stale queue entry) - just reschedule
+
+        if room.sold_status:
+            finalize_result(room)
+        else:
+            _mark_result(room)
+        return room_deadline(room)
+
+
+class AuctionClock:
+    """Priority queue of (deadline, room code) for every live room"""
+
+    def __init__(self, rescan_seconds=1.0):
+        self.rescan_seconds = rescan_seconds
+        self._queue = []
+
+    def load(self):
+        """Rebuild the queue from the live rooms (picks up starts, resumes, bids)"""
+        rooms = Room.objects.filter(is_live=True, is_paused=False).only(
+            "code", "is_live", "is_paused", "deadline_at", "sold_status", "sold_at"
+        )
+        self._queue = []
+        for room in rooms:
+            deadline = room_deadline(room)
+            if deadline:
+                self._queue.append((deadline, room.code))
+        heapq.heapify(self._queue)
+
+    def settle_due(self):
+        """Settle every room whose deadline has passed"""
+        settled = 0
+        now = timezone.now()
+        due = set()
+        while self._queue and self._queue[0][0] <= now:
+            due.add(heapq.heappop(self._queue)[1])
+
+        for code in due:
+            try:
+                deadline = settle_room(code)
+            except Exception:
+                logger.exception("Failed to settle room %s", code)
+                continue
+            settled += 1
+            if deadline:
+                heapq.heappush(self._queue, (deadline, code))
+        return settled
+
+    def seconds_until_next(self):
+        if not self._queue:
+            return None
+        return max(0.0, (self._queue[0][0] - timezone.now()).total_seconds())
+
+    def run_forever(self):
+        next_scan = 0.0
+        while True:
+            if time.monotonic() >= next_scan:
+                close_old_connections()
+                self.load()
+                next_scan = time.monotonic() + self.rescan_seconds
+
+            self.settle_due()
+
+            sleep_for = next_scan - time.monotonic()
+            until_next = self.seconds_until_next()
+            if until_next is not None:
+                sleep_for = min(sleep_for, until_next)
+            time.sleep(max(0.0, sleep_for))
+
+
+def settle_due_rooms():
+    """One pass over every live room - handy for tests and cron-style runs"""
+    clock = AuctionClock()
+    clock.load()
+    return clock.settle_due()
@@ -0,0 +1,125 @@
+"""
+Write-behind buffer for the Bid ledger.
+
+submit_bid() only appends the accepted bid to a per-room buffer in this
+process; the rows are written with one bulk INSERT when
+
+    - the room has AUCTION_BID_LEDGER_BATCH bids waiting,
+    - the oldest waiting bid is AUCTION_BID_LEDGER_MAX_AGE seconds old -
+      checked on every bid and by a background flusher thread, so the
+      last lot's bids are written even when no further bid comes, or
+    - the lot is settled: broadcast.deliver() flushes the room on every
+      sold / unsold / skipped event in every process that hears it (with
+      the in-memory broadcast that is only the settling process - the
+      flusher covers the others).
+
+Bid.sequence is the room version the bid produced; it is unique per room,
+so flushing the same rows twice is harmless. Bids still buffered when a
+worker is killed are lost - the ledger is history, not the source of truth.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from ..models import Bid
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_buffers = {}  # room code -> (first buffered at, [Bid, ...])
+_flusher = None
+
+
+def record_bid(room, team, amount, sequence=None):
+    """Queue an accepted bid (call after the room was saved)"""
+    bid = Bid(
+        room_id=room.pk,
+        player_id=room.current_player_id,
+        team=team,
+        amount=amount,
+        placed_at=timezone.now(),
+        sequence=sequence or room.version,
+    )
+    with _lock:
+        started, rows = _buffers.setdefault(room.code, (time.monotonic(), []))
+        rows.append(bid)
+        due = (
+            len(rows) >= settings.AUCTION_BID_LEDGER_BATCH
+            or time.monotonic() - started >= settings.AUCTION_BID_LEDGER_MAX_AGE
+        )
+    if due:
+        flush(room.code)
+    _start_flusher()
+
+
+def pending(code):
+    """Bids of a room still waiting to be written"""
+    with _lock:
+        return list(_buffers.get(code, (None, []))[1])
+
+
+def flush(code):
+    """Write a room's buffered bids in one batch"""
+    with _lock:
+        _, rows = _buffers.pop(code, (None, []))
+    if not rows:
+        return 0
+    try:
+        Bid.objects.bulk_create(rows, ignore_conflicts=True)
+    except DatabaseError:
+        logger.exception("Dropped %d buffered bids of room %s", len(rows), code)
+        metrics.incr("bid_ledger.dropped", len(rows))
+        return 0
+    metrics.incr("bid_ledger.flushed", len(rows))
+    return len(rows)
+
+
+def flush_due():
+    """Write out every room whose oldest buffered bid has reached the max age"""
+    now = time.monotonic()
+    with _lock:
+        codes = [
+            code for code, (started, _) in _buffers.items()
+            if now - started >= settings.AUCTION_BID_LEDGER_MAX_AGE
+        ]
+    for code in codes:
+        flush(code)
+    return len(codes)
+
+
+def _flush_forever():
+    while True:
+        time.sleep(max(settings.AUCTION_BID_LEDGER_MAX_AGE / 2, 0.1))
+        try:
+            flush_due()
+        except Exception:
+            logger.exception("Bid ledger flush failed")
+        finally:
+            close_old_connections()  # This thread's own connection
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_forever, name="bid-ledger-flusher", daemon=True)
+            _flusher.start()
+
+
+def flush_all():
+    with _lock:
+        codes = list(_buffers)
+    for code in codes:
+        flush(code)
+
+
+atexit.register(flush_all)  # Graceful worker shutdown
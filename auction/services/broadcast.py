@@ -0,0 +1,141 @@
+"""
+Pluggable broadcast layer for room events.
+
+Views call publish(); the configured backend gets the event to every
+process that has listeners, where deliver() hands it to the local SSE /
+WebSocket hub (room_events), which also wakes long-polls.
+
+Backends (settings.AUCTION_BROADCAST_BACKEND):
+    auction.services.broadcast.InMemoryBroadcast  - single process (default)
+    auction.services.broadcast.PostgresBroadcast  - LISTEN/NOTIFY, all processes
+"""
+
+import json
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from . import bid_ledger, room_cache
+from .room_events import publish_event
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "auction_room_events"
+MAX_PAYLOAD = 7900  # Postgres NOTIFY payloads must stay under 8000 bytes
+SETTLEMENT_EVENTS = ("sold", "unsold", "skipped")
+
+
+def deliver(code, event_type, data):
+    """Hand an event to this process's listeners"""
+    if event_type == "state":
+        room_cache.set_version(code, data["version"])  # before waking anyone who will re-read it
+    elif event_type in ("chat", "log") and "id" in data:
+        room_cache.set_head(code, event_type, data["id"])
+    elif event_type in SETTLEMENT_EVENTS:
+        bid_ledger.flush(code)  # The lot is over - write out its buffered bids
+    publish_event(code, event_type, data)
+
+
+class InMemoryBroadcast:
+    """Delivers within the publishing process - fine for one worker"""
+
+    cross_process = False
+
+    def start(self):
+        pass
+
+    def publish(self, code, event_type, data):
+        # Like NOTIFY, only deliver once the change is committed
+        transaction.on_commit(lambda: deliver(code, event_type, data))
+
+
+class PostgresBroadcast:
+    """
+    Fans events out to every worker through Postgres LISTEN/NOTIFY.
+    NOTIFY is sent on the request's own connection (so it is delivered on
+    commit); each process runs one listener thread on a dedicated connection
+    and delivers what it hears - including its own events - locally.
+    """
+
+    cross_process = True
+
+    def __init__(self):
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._listen, name="auction-broadcast", daemon=True).start()
+
+    def publish(self, code, event_type, data):
+        payload = json.dumps({"room": code, "event": event_type, "data": data}, default=str)
+        if len(payload.encode()) > MAX_PAYLOAD:
+            # Too big for NOTIFY - tell listeners to refetch instead
+            payload = json.dumps({"room": code, "event": event_type, "data": {"truncated": True}})
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
+
+    def _connect(self):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        db = settings.DATABASES["default"]
+        conn = psycopg2.connect(
+            dbname=db["NAME"],
+            user=db.get("USER") or None,
+            password=db.get("PASSWORD") or None,
+            host=db.get("HOST") or None,
+            port=db.get("PORT") or None,
+            **db.get("OPTIONS", {})
+        )
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL};")
+        return conn
+
+    def _listen(self):
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue  # Idle - loop so a dead socket is noticed
+                    conn.poll()
+                    while conn.notifies:
+                        message = json.loads(conn.notifies.pop(0).payload)
+                        deliver(message["room"], message["event"], message["data"])
+            except Exception:
+                logger.exception("Broadcast listener lost its connection, reconnecting")
+                if conn is not None:
+                    conn.close()
+                time.sleep(1)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_broadcast():
+    """The configured backend, started on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = import_string(settings.AUCTION_BROADCAST_BACKEND)()
+                backend.start()
+                _backend = backend
+    return _backend
+
+
+def publish(code, event_type, data):
+    """Broadcast a room event to every listening process"""
+    get_broadcast().publish(code, event_type, data)
@@ -0,0 +1,26 @@
+"""
+Blocking ORM calls from async code (WebSocket, long-poll, SSE).
+
+Django's async ORM runs queries in the request's thread-sensitive context,
+which pins one thread - and its DB connection - to every waiting request.
+run_db() borrows a thread from the shared pool instead and closes the
+connection when done, so an idle async client holds neither.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def _in_db_thread(func, *args):
+    # Runs in a worker thread outside Django's request cycle, so manage
+    # the thread's DB connection the way a request would
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_db(func, *args):
+    """Run a blocking ORM call without holding up the event loop"""
+    return await sync_to_async(_in_db_thread, thread_sensitive=False)(func, *args)
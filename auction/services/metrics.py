@@ -0,0 +1,78 @@
+"""
+In-process counters for the hot paths (cache hits/misses etc.) and
+gauges - exponentially weighted moving averages such as request latency.
+
+Counters and gauges are per worker process; GET /api/metrics/ reports the process
+that served the request.
+"""
+
+import threading
+import time
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+_gauges = {}
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def counters():
+    """Copy of all counters"""
+    with _lock:
+        return dict(_counters)
+
+
+def observe(name, value, weight=0.1):
+    """Fold a sample into the gauge's moving average"""
+    with _lock:
+        previous = _gauges.get(name)
+        _gauges[name] = value if previous is None else previous + weight * (value - previous)
+
+
+def gauge(name, default=None):
+    with _lock:
+        return _gauges.get(name, default)
+
+
+def gauges():
+    """Copy of all gauges"""
+    with _lock:
+        return dict(_gauges)
+
+
+class StageTimer:
+    """
+    Times the stages of one request into gauges "<prefix>.<stage>_ms".
+    Each mark() closes the stage that started at the previous mark; a
+    disabled timer does nothing at all.
+    """
+
+    def __init__(self, prefix, enabled=True):
+        self.prefix = prefix
+        self.enabled = enabled
+        if enabled:
+            self._started = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        observe(f"{self.prefix}.{stage}_ms", (now - self._last) * 1000)
+        self._last = now
+
+    def finish(self):
+        """Record the total and count the timed request"""
+        if not self.enabled:
+            return
+        observe(f"{self.prefix}.total_ms", (time.perf_counter() - self._started) * 1000)
+        incr(f"{self.prefix}.timed")
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
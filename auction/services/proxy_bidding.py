@@ -0,0 +1,104 @@
+"""
+Proxy (max-bid) auto-bidding.
+
+A team registers a hidden maximum for the current player or one coming up
+(ProxyBid). Whenever the lot could move - a player comes up, the auction
+resumes, a human bid lands or a proxy is registered - resolve_proxies()
+plays the bidding war out in memory, one ladder step at a time, until no
+proxy is left that can beat the leader:
+
+    A (max 300) vs B (max 260), base 200:
+        A 200, B 220, A 240, B 260, A 280  -> A leads at 280
+
+The whole sequence is applied under the room's row lock with one save:
+every step goes to the Bid ledger with its own sequence number, while
+listeners get a single "bid" event and the log a single line.
+"""
+
+from django.db import transaction
+
+from ..models import Participant, ProxyBid
+from . import bid_ledger
+from .broadcast import publish
+from .room_ops import (
+    add_log, is_overseas, lock_room, next_bid, remaining_seconds, restart_timer, save_room
+)
+
+
+def _proxy_caps(room, proxies):
+    """team -> the most its proxy can actually bid (max, purse and squad limits)"""
+    participants = {
+        p.team: p for p in Participant.objects.filter(room=room, team__in=[x.team for x in proxies])
+    }
+    overseas = is_overseas(room.current_player)
+    caps = {}
+    for proxy in proxies:
+        participant = participants.get(proxy.team)
+        if participant is None or participant.squad_count >= 25:
+            continue
+        if overseas and participant.overseas_count >= 8:
+            continue
+        caps[proxy.team] = min(proxy.max_amount, participant.purse)
+    return caps
+
+
+def resolve_proxies(room):
+    """
+    Let the proxies for the room's current player bid until one is left
+    standing. Returns the [(team, amount), ...] bids that were placed.
+    """
+    if not room.current_player_id or not ProxyBid.objects.filter(
+        room_id=room.pk, player_id=room.current_player_id
+    ).exists():
+        return []  # Common case - no extra locking
+
+    with transaction.atomic():
+        room = lock_room(room.code, "current_player")
+        if room is None or not room.current_player or not room.is_live or room.is_paused or room.sold_status:
+            return []
+        if remaining_seconds(room) <= 0:
+            return []  # Lot is closed - the clock settles it as it stands
+
+        proxies = list(
+            ProxyBid.objects.filter(room=room, player=room.current_player).order_by("created_at", "id")
+        )
+        caps = _proxy_caps(room, proxies)
+        registered = {proxy.team: i for i, proxy in enumerate(proxies)}  # Earlier proxy wins a tie
+
+        bids = []
+        while True:
+            amount = next_bid(room)
+            contenders = [
+                team for team, cap in caps.items() if team != room.highest_bidder and cap >= amount
+            ]
+            if not contenders:
+                break
+            team = max(contenders, key=lambda t: (caps[t], -registered[t]))
+            room.current_bid = amount
+            room.highest_bidder = team
+            bids.append((team, amount))
+
+        if not bids:
+            return []
+
+        # One version (= ledger sequence) per step
+        first_sequence = room.version + 1
+        restart_timer(room)
+        save_room(room, steps=len(bids))
+
+        for sequence, (team, amount) in enumerate(bids, first_sequence):
+            bid_ledger.record_bid(room, team, amount, sequence=sequence)
+        publish(room.code, "bid", {
+            "team": room.highest_bidder,
+            "amount": room.current_bid,
+            "timer": room.default_timer_duration,
+            "deadline_at": room.deadline_at,
+            "version": room.version,
+            "proxy_bids": len(bids)
+        })
+
+        price = room.current_bid
+        bid_text = f"₹{price / 100} Cr" if price >= 100 else f"₹{price}L"
+        steps = f" after {len(bids)} proxy bids" if len(bids) > 1 else " (proxy)"
+        add_log(room, f"🤖 {room.highest_bidder} bid {bid_text}{steps}")
+    return bids
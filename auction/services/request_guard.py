@@ -0,0 +1,151 @@
+"""
+Cheap rejection of repeated write requests (bids, sell, skip).
+
+Clients double-click and retry slow POSTs. guard_request() sits in front of
+those views and, before any query runs:
+
+    1. replays the stored result of a request it has already seen - by the
+       client's Idempotency-Key header (kept AUCTION_IDEMPOTENCY_TTL seconds)
+       or, without one, by a fingerprint of the request (the same bid / sell /
+       skip within AUCTION_DUPLICATE_WINDOW seconds);
+    2. takes a token from the (room, team) bucket - AUCTION_BID_RATE per
+       second, bursts of AUCTION_BID_BURST - and answers 429 when it is empty.
+
+The WebSocket channel runs bids through the same guard (run_guarded).
+
+Results are kept in the room-state cache alias (shared between workers when
+a shared cache is configured); the buckets are per process.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from . import metrics
+
+MAX_BUCKETS = 10000  # idle (room, team) buckets beyond this are dropped, oldest first
+IN_PROGRESS = "in-progress"
+
+_lock = threading.Lock()
+_buckets = OrderedDict()  # (room, team) -> [tokens, last refill]
+
+
+def take_token(code, team):
+    """Spend one request token of the (room, team) bucket; False when empty"""
+    rate = settings.AUCTION_BID_RATE
+    burst = settings.AUCTION_BID_BURST
+    now = time.monotonic()
+    key = (code, team)
+    with _lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = [float(burst), now]
+            if len(_buckets) > MAX_BUCKETS:
+                _buckets.popitem(last=False)
+        else:
+            _buckets.move_to_end(key)
+            bucket[0] = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+
+def _cache():
+    return caches[settings.AUCTION_STATE_CACHE]
+
+
+def request_key(endpoint, code, client_key, parts):
+    """
+    (cache key, ttl) identifying repeats of a request - by the client's
+    idempotency key, else by its fingerprint `parts` - or (None, None)
+    """
+    if client_key:
+        return f"idempotency:{endpoint}:{code}:{client_key}", settings.AUCTION_IDEMPOTENCY_TTL
+    if parts is not None:
+        parts = ":".join(str(part) for part in parts)
+        return f"duplicate:{endpoint}:{parts}", settings.AUCTION_DUPLICATE_WINDOW
+    return None, None
+
+
+def _rate_limited(endpoint):
+    metrics.incr(f"{endpoint}.rate_limited")
+    return {"error": "Too many requests, slow down"}, 429, False
+
+
+def run_guarded(endpoint, code, team, key, ttl, call):
+    """
+    The guard itself, shared by guard_request() and the WebSocket channel.
+    `call()` does the work and returns (data, status); `key`/`ttl` come from
+    request_key(). Returns (data, status, replayed).
+    """
+    if key is None:
+        if not take_token(code, team):
+            return _rate_limited(endpoint)
+        return (*call(), False)
+
+    cache = _cache()
+    if not cache.add(key, IN_PROGRESS, ttl):
+        stored = cache.get(key)
+        if stored is not None:  # (else it just expired - handle as new)
+            metrics.incr(f"{endpoint}.duplicate")
+            if stored == IN_PROGRESS:
+                return {"error": "Duplicate request in progress"}, 409, False
+            data, status = stored
+            return data, status, True
+        cache.set(key, IN_PROGRESS, ttl)
+
+    if not take_token(code, team):
+        cache.delete(key)
+        return _rate_limited(endpoint)
+
+    try:
+        data, status = call()
+    except Exception:
+        cache.delete(key)
+        raise
+    if status >= 500:
+        cache.delete(key)  # Let the client retry for real
+    else:
+        cache.set(key, (data, status), ttl)
+    return data, status, False
+
+
+def guard_request(endpoint, fingerprint):
+    """
+    Decorator for DRF function views (put it under @api_view).
+    `fingerprint(data)` returns the tuple identifying a duplicate of the
+    request when the client sent no Idempotency-Key (None: only dedupe by key).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            code = request.data.get("code")
+            team = request.data.get("team") or "host"
+            key, ttl = request_key(
+                endpoint, code, request.headers.get("Idempotency-Key"), fingerprint(request.data)
+            )
+
+            responses = []
+
+            def call():
+                responses.append(view(request, *args, **kwargs))
+                return responses[0].data, responses[0].status_code
+
+            data, status, replayed = run_guarded(endpoint, code, team, key, ttl, call)
+            if responses:
+                return responses[0]
+            headers = {}
+            if replayed:
+                headers["Idempotent-Replayed"] = "true"
+            elif status == 429:
+                headers["Retry-After"] = str(max(1, round(1 / settings.AUCTION_BID_RATE)))
+            return Response(data, status=status, headers=headers)
+        return wrapper
+    return decorator
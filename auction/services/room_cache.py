@@ -0,0 +1,228 @@
+"""
+Read-through cache of the room-state snapshot.
+
+The snapshot is everything get_room_state returns that is the same for
+every team, stored together with a small {team: budget} map that is
+overlaid per request. A steady-state poll is two cache reads and no SQL
+(plus one version lookup when the cache is process-local, see below).
+
+Entries are keyed by room version, and a separate key holds the room's
+current version:
+
+    room-version:<code>          -> latest committed version
+    room-state:<code>:<version>  -> {"state": {...}, "budgets": {...}}
+
+A short ring buffer of recent snapshot states (room-history:<code>) lets
+get_room_state answer "what changed since version N" with a delta.
+
+Chat and log "heads" (latest message id) are kept too, so a dashboard poll
+can tell there is nothing new without querying.
+
+Squads (every team's purchases and purse, as served by get_summary) are
+a read model keyed by the room's squad_version (room-squads:<code>:<v>).
+When a lot is sold, apply_sale() derives version v from v-1 plus the sale
+instead of re-querying; a missing version is rebuilt from the database.
+
+Lobby pages (public rooms of the day) live for AUCTION_LOBBY_CACHE_TTL
+seconds under a lobby "generation"; creating, joining or starting a room
+bumps the generation, which retires every cached page at once.
+
+Pages of the upcoming-players list are keyed by the room's lineup position
+(room-upcoming:<code>:<position>:<cursor>:<limit>), so moving to the next
+player leaves the old pages behind to expire.
+
+Writers publish the new version (save_room, and broadcast.deliver in every
+process), which makes older snapshots unreachable. The version key only
+ever moves forward, so neither a read racing a write nor two writes landing
+out of order can put an old version back.
+
+Backed by Django's cache framework (settings.AUCTION_STATE_CACHE alias),
+locmem by default. A locmem cache with the in-memory broadcast never hears
+about writes made by other processes (such as the auction clock), so in
+that setup readers confirm the cached version against the database
+(is_process_local()).
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from ..models import lakhs_to_crores
+from . import metrics
+
+HISTORY_SIZE = 16  # recent versions kept per room for delta responses
+
+
+def _cache():
+    return caches[settings.AUCTION_STATE_CACHE]
+
+
+def _version_key(code):
+    return f"room-version:{code}"
+
+
+def _snapshot_key(code, version):
+    return f"room-state:{code}:{version}"
+
+
+_forward_lock = threading.Lock()
+
+
+def _set_forward(key, value):
+    """Store `value` unless the key already holds a larger one"""
+    cache = _cache()
+    with _forward_lock:  # (a shared cache can still interleave across processes)
+        current = cache.get(key)
+        if current is None or value > current:
+            cache.set(key, value, settings.AUCTION_STATE_CACHE_TTL)
+
+
+def is_process_local():
+    """True when writes from other processes can't reach this cache"""
+    backend = settings.CACHES[settings.AUCTION_STATE_CACHE]["BACKEND"]
+    return backend.endswith(("LocMemCache", "DummyCache"))
+
+
+def set_version(code, version):
+    """Writers: the room moved to `version` - older snapshots are now stale"""
+    _set_forward(_version_key(code), version)
+
+
+def get_version(code):
+    """Newest room version this cache has heard of, or None"""
+    return _cache().get(_version_key(code))
+
+
+def get_snapshot(code):
+    """Cached snapshot of the room's current version, or None"""
+    cache = _cache()
+    version = cache.get(_version_key(code))
+    entry = cache.get(_snapshot_key(code, version)) if version is not None else None
+    metrics.incr("room_state_cache.hit" if entry is not None else "room_state_cache.miss")
+    return entry
+
+
+def set_snapshot(code, entry):
+    """Readers: store a snapshot rebuilt from the database"""
+    version = entry["state"]["version"]
+    cache = _cache()
+    cache.set(_snapshot_key(code, version), entry, settings.AUCTION_STATE_CACHE_TTL)
+    set_version(code, version)
+    _record_history(code, entry["state"])
+
+
+def _history_key(code):
+    return f"room-history:{code}"
+
+
+def _record_history(code, state):
+    cache = _cache()
+    history = cache.get(_history_key(code)) or []
+    if any(version == state["version"] for version, _ in history):
+        return
+    history.append((state["version"], state))
+    history.sort(key=lambda item: item[0])
+    cache.set(_history_key(code), history[-HISTORY_SIZE:], settings.AUCTION_STATE_CACHE_TTL)
+
+
+def get_history_state(code, version):
+    """Snapshot state of an earlier version, or None if it left the ring buffer"""
+    for known_version, state in _cache().get(_history_key(code)) or []:
+        if known_version == version:
+            return state
+    return None
+
+
+def _head_key(code, section):
+    return f"room-head:{code}:{section}"
+
+
+def set_head(code, section, last_id):
+    """Record the newest id of a room's chat/log stream (never moves backwards)"""
+    _set_forward(_head_key(code, section), last_id)
+
+
+def get_heads(code, sections):
+    """{section: newest id} for the sections whose head is known"""
+    keys = {_head_key(code, section): section for section in sections}
+    return {keys[key]: value for key, value in _cache().get_many(list(keys)).items()}
+
+
+def _upcoming_key(code, position, cursor, limit):
+    return f"room-upcoming:{code}:{position}:{cursor}:{limit}"
+
+
+def get_upcoming_page(code, position, cursor, limit):
+    page = _cache().get(_upcoming_key(code, position, cursor, limit))
+    metrics.incr("upcoming_cache.hit" if page is not None else "upcoming_cache.miss")
+    return page
+
+
+def set_upcoming_page(code, position, cursor, limit, page):
+    _cache().set(_upcoming_key(code, position, cursor, limit), page, settings.AUCTION_UPCOMING_CACHE_TTL)
+
+
+def _squads_key(code, squad_version):
+    return f"room-squads:{code}:{squad_version}"
+
+
+def get_squads(code, squad_version):
+    summary = _cache().get(_squads_key(code, squad_version))
+    metrics.incr("squads_cache.hit" if summary is not None else "squads_cache.miss")
+    return summary
+
+
+def set_squads(code, squad_version, summary):
+    _cache().add(_squads_key(code, squad_version), summary, settings.AUCTION_STATE_CACHE_TTL)
+
+
+def apply_sale(code, squad_version, team, player, price):
+    """Derive the squads of `squad_version` from the previous version plus one sale"""
+    summary = _cache().get(_squads_key(code, squad_version - 1))
+    if summary is None:
+        return  # Rebuilt from the database on the next read
+    row = next((row for row in summary if row["team"] == team), None)
+    if row is None:
+        return
+    if not any(p["id"] == player["id"] for p in row["players"]):  # (a rebuild may already have it)
+        row["players"].append(player)
+        row["players_count"] = len(row["players"])
+        purse = round(row["budget_remaining"] * 100) - price  # Crores → Lakhs
+        row["budget_remaining"] = float(lakhs_to_crores(purse))
+    set_squads(code, squad_version, summary)
+
+
+LOBBY_GENERATION_KEY = "lobby-generation"
+
+
+def _lobby_key(generation, status, cursor, limit):
+    return f"lobby:{generation}:{status}:{cursor}:{limit}"
+
+
+def _lobby_generation(cache):
+    cache.add(LOBBY_GENERATION_KEY, 0, None)
+    return cache.get(LOBBY_GENERATION_KEY, 0)
+
+
+def get_lobby_page(status, cursor, limit):
+    cache = _cache()
+    page = cache.get(_lobby_key(_lobby_generation(cache), status, cursor, limit))
+    metrics.incr("lobby_cache.hit" if page is not None else "lobby_cache.miss")
+    return page
+
+
+def set_lobby_page(status, cursor, limit, page):
+    cache = _cache()
+    key = _lobby_key(_lobby_generation(cache), status, cursor, limit)
+    cache.set(key, page, settings.AUCTION_LOBBY_CACHE_TTL)
+
+
+def invalidate_lobby():
+    """A room was created, joined or started - drop every cached lobby page"""
+    cache = _cache()
+    _lobby_generation(cache)
+    try:
+        cache.incr(LOBBY_GENERATION_KEY)
+    except ValueError:  # Evicted in between
+        cache.set(LOBBY_GENERATION_KEY, 1, None)
@@ -0,0 +1,188 @@
+"""
+In-process room event hub for the Server-Sent Events stream.
+
+Views publish typed events (bid, sold, unsold, skipped, pause, chat, log,
+state) with publish_event(). Each room keeps a short ring buffer so a
+reconnecting client can resume from its Last-Event-ID instead of replaying
+the whole history. Subscribers are asyncio tasks - publishing from a sync
+view thread wakes them with call_soon_threadsafe, so an idle connection
+costs one Event object and no thread.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+BUFFER_SIZE = 200  # events kept per room for Last-Event-ID resume
+MAX_ROOMS = 1000  # idle room buffers beyond this are evicted (oldest first)
+HEARTBEAT_SECONDS = 15  # keeps proxies from closing idle streams
+
+# Event ids look like "<epoch>-<seq>". The epoch changes on every process
+# start, so ids from a previous process are detected and answered with a resync.
+EPOCH = format(int(time.time() * 1000), "x")
+
+_lock = threading.Lock()
+_rooms = OrderedDict()  # code -> _RoomChannel, most recently used last
+
+
+class _RoomChannel:
+    def __init__(self):
+        self.seq = itertools.count(1)
+        self.buffer = deque(maxlen=BUFFER_SIZE)
+        self.subscribers = set()
+
+
+class Subscription:
+    """One SSE connection waiting for events of a room"""
+
+    def __init__(self, code):
+        self.code = code
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    async def wait(self, timeout):
+        """Wait for new events; returns False on timeout"""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self.event.clear()
+        return True
+
+    def close(self):
+        with _lock:
+            channel = _rooms.get(self.code)
+            if channel:
+                channel.subscribers.discard(self)
+
+
+def _channel(code):
+    """Get (or create) a room's channel - caller must hold _lock"""
+    channel = _rooms.get(code)
+    if channel is None:
+        channel = _rooms[code] = _RoomChannel()
+        if len(_rooms) > MAX_ROOMS:
+            for stale_code in list(_rooms):
+                if len(_rooms) <= MAX_ROOMS:
+                    break
+                if not _rooms[stale_code].subscribers:
+                    del _rooms[stale_code]
+    else:
+        _rooms.move_to_end(code)
+    return channel
+
+
+def publish_event(code, event_type, data):
+    """Append an event to the room's buffer and wake its subscribers"""
+    with _lock:
+        channel = _channel(code)
+        event = {
+            "id": f"{EPOCH}-{next(channel.seq)}",
+            "event": event_type,
+            "data": data,
+        }
+        channel.buffer.append(event)
+        subscribers = list(channel.subscribers)
+
+    for subscriber in subscribers:
+        subscriber.loop.call_soon_threadsafe(subscriber.event.set)
+    return event
+
+
+def subscribe(code):
+    """Register the running task as a listener (call before reading the backlog)"""
+    subscription = Subscription(code)
+    with _lock:
+        _channel(code).subscribers.add(subscription)
+    return subscription
+
+
+def _parse_event_id(event_id):
+    epoch, _, seq = (event_id or "").partition("-")
+    if epoch != EPOCH or not seq.isdigit():
+        return None
+    return int(seq)
+
+
+def events_since(code, last_event_id):
+    """
+    Buffered events after `last_event_id`.
+    Returns None when the id is unknown or too old to resume from - the
+    client has to refetch a full snapshot.
+    """
+    last_seq = _parse_event_id(last_event_id)
+    if last_seq is None:
+        return None
+
+    with _lock:
+        buffer = list(_channel(code).buffer)
+
+    events = [e for e in buffer if _parse_event_id(e["id"]) > last_seq]
+    oldest_needed = last_seq + 1
+    if events and _parse_event_id(events[0]["id"]) != oldest_needed:
+        return None  # Gap - some events already fell out of the buffer
+    return events
+
+
+def latest_event_id(code):
+    with _lock:
+        buffer = _channel(code).buffer
+        return buffer[-1]["id"] if buffer else f"{EPOCH}-0"
+
+
+def format_sse(event):
+    """Serialize an event in text/event-stream wire format"""
+    return (
+        f"id: {event['id']}\n"
+        f"event: {event['event']}\n"
+        f"data: {json.dumps(event['data'], default=str)}\n\n"
+    )
+
+
+def _resync_event(code):
+    return {"id": latest_event_id(code), "event": "resync", "data": {}}
+
+
+async def follow_events(code, last_event_id=None):
+    """
+    Async generator of a room's events for one connection (SSE or WebSocket).
+    Resumes after `last_event_id` when it is still buffered, otherwise
+    yields a `resync` event telling the client to refetch the room state.
+    Yields None whenever HEARTBEAT_SECONDS pass without events.
+    """
+    subscription = subscribe(code)  # before reading the backlog so nothing is missed
+    try:
+        backlog = events_since(code, last_event_id) if last_event_id else []
+        if backlog is None:  # Unknown or expired id
+            backlog = [_resync_event(code)]
+        cursor = last_event_id or latest_event_id(code)
+
+        while True:
+            for event in backlog:
+                yield event
+                cursor = event["id"]
+
+            if not await subscription.wait(HEARTBEAT_SECONDS):
+                backlog = []
+                yield None
+                continue
+
+            backlog = events_since(code, cursor)
+            if backlog is None:  # Fell too far behind
+                backlog = [_resync_event(code)]
+    finally:
+        subscription.close()
+
+
+async def stream_events(code, last_event_id=None):
+    """Async generator of text/event-stream frames"""
+    yield "retry: 3000\n\n"
+    events = follow_events(code, last_event_id)
+    try:
+        async for event in events:
+            yield format_sse(event) if event else ": keepalive\n\n"
+    finally:
+        await events.aclose()
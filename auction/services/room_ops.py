@@ -0,0 +1,300 @@
+"""
+Room mutations shared by the API views and the auction clock.
+
+Every change to a Room goes through save_room() (or the compare-and-swap
+save_room_if_unchanged()) so its version moves forward and listeners
+(long-polls, SSE, WebSockets) hear about it.
+
+Writers other than bids read the room with lock_room() inside
+transaction.atomic(), so nothing lands between their read and their save.
+save_room() is conditional on the version as well: a stale copy raises
+StaleRoomError instead of wiping a newer state under a reused version.
+"""
+
+from bisect import bisect_right
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from ..models import Player, Room, RoomLineup, Auction, Participant, AuctionLog
+from . import room_cache
+from .broadcast import publish
+from .team_evaluator import role_category
+
+# Participant counter bumped for each composition role
+ROLE_COUNT_FIELDS = {
+    "BATSMAN": "batsman_count",
+    "BOWLER": "bowler_count",
+    "ALL ROUNDER": "all_rounder_count",
+    "WICKET KEEPER": "wicket_keeper_count",
+}
+
+
+def _room_saved(room):
+    room_cache.set_version(room.code, room.version)  # Cached snapshots are now stale
+    publish(room.code, "state", {"version": room.version})  # Wakes long-polls + streams
+
+
+class StaleRoomError(Exception):
+    """save_room() was given a copy of the room that another write has replaced"""
+
+
+def lock_room(code, *related):
+    """
+    The room row, locked until the surrounding transaction ends (None if
+    there is no such room). `related` is passed to select_related().
+    """
+    return (
+        Room.objects.select_for_update(of=("self",)).select_related(*related).filter(code=code).first()
+    )
+
+
+def save_room(room, steps=1):
+    """
+    Persist a room mutation and bump its state version (by `steps` when
+    one save stands for several changes, e.g. a run of proxy bids)
+    """
+    fields = {
+        field.attname: getattr(room, field.attname)
+        for field in Room._meta.concrete_fields
+        if not field.primary_key and field.name != "version"
+    }
+    updated = Room.objects.filter(pk=room.pk, version=room.version).update(
+        version=room.version + steps, **fields
+    )
+    if not updated:
+        raise StaleRoomError(f"Room {room.code} changed since version {room.version} was read")
+    room.version += steps
+    _room_saved(room)
+
+
+def save_room_if_unchanged(room, fields):
+    """
+    Compare-and-swap save: write only `fields` (plus the version) in one
+    conditional UPDATE, and only if nobody saved the room since it was read.
+    Returns False on a conflict - re-read the room and decide again.
+    """
+    updated = Room.objects.filter(pk=room.pk, version=room.version).update(
+        version=room.version + 1,
+        **{field: getattr(room, field) for field in fields}
+    )
+    if not updated:
+        return False
+    room.version += 1
+    _room_saved(room)
+    return True
+
+
+# Bid ladder (in Lakhs): from each price upwards, bids go up by this step
+BID_LADDER = (
+    (0, 5),      # Under ₹100L → +₹5L
+    (100, 10),   # ₹100L-199L → +₹10L
+    (200, 20),   # ₹200L+ → +₹20L
+)
+_LADDER_PRICES = [price for price, _ in BID_LADDER]
+
+
+def bid_increment(current_bid):
+    """Step between bids at the given price (in Lakhs)"""
+    return BID_LADDER[bisect_right(_LADDER_PRICES, current_bid) - 1][1]
+
+
+def next_bid(room):
+    """The only bid the room accepts right now: base price to open, then one step up"""
+    if not room.highest_bidder:
+        return room.current_bid
+    return room.current_bid + bid_increment(room.current_bid)
+
+
+def seconds_left(is_live, deadline_at, paused_remaining, default_duration, now=None):
+    """Seconds left on a lot's clock from its stored timer fields"""
+    if paused_remaining is not None:
+        return paused_remaining
+    if not is_live or deadline_at is None:
+        return float(default_duration)
+    now = now or timezone.now()
+    return max(0.0, (deadline_at - now).total_seconds())
+
+
+def remaining_seconds(room, now=None):
+    """Seconds left on the current lot's clock - a pure read, never writes"""
+    return seconds_left(
+        room.is_live, room.deadline_at, room.paused_remaining, room.default_timer_duration, now
+    )
+
+
+def restart_timer(room, now=None):
+    """Give the lot a full clock (new player or new bid)"""
+    if room.is_paused:
+        room.deadline_at = None
+        room.paused_remaining = float(room.default_timer_duration)
+    else:
+        now = now or timezone.now()
+        room.deadline_at = now + timedelta(seconds=room.default_timer_duration)
+        room.paused_remaining = None
+
+
+def add_log(room, message):
+    """Persist an auction log line and push it to event streams"""
+    log = AuctionLog.objects.create(room=room, message=message)
+    publish(room.code, "log", {
+        "id": log.id,
+        "message": log.message,
+        "timestamp": log.timestamp.strftime("%H:%M:%S")
+    })
+    return log
+
+
+def is_overseas(player):
+    return player.country.lower() != "india"
+
+
+def record_sale(room, team, price):
+    """
+    Charge the buying team and create the finalized Auction record.
+    Returns False (and records nothing) if the team's purse can't cover it.
+    """
+    buyer = Participant.objects.filter(room=room, team=team).values_list("pk", flat=True).first()
+
+    # Single UPDATE with F(), guarded by the balance, so concurrent
+    # settlements can neither lose a deduction nor overdraw the purse
+    player = room.current_player
+    role_field = ROLE_COUNT_FIELDS[role_category(player.role)]
+    charged = Participant.objects.filter(pk=buyer, purse__gte=price).update(
+        purse=F('purse') - price,
+        spent=F('spent') + price,
+        squad_count=F('squad_count') + 1,
+        overseas_count=F('overseas_count') + (1 if is_overseas(player) else 0),
+        **{role_field: F(role_field) + 1}
+    )
+    if not charged:
+        return False
+
+    # ✅ CREATE FINALIZED Auction record (player is SOLD!)
+    Auction.objects.create(
+        room=room,
+        player=player,
+        participant_id=buyer,
+        price=price,
+        is_finalized=True
+    )
+
+    room.squad_version += 1  # Squads/summary changed - persisted by the caller's save_room
+
+    # Roll the cached squads read model forward once the sale is committed
+    sale = {
+        "id": player.id,
+        "name": player.name,
+        "price": price,
+        "role": player.role,
+        "country": player.country
+    }
+    code, squad_version = room.code, room.squad_version
+    transaction.on_commit(lambda: room_cache.apply_sale(code, squad_version, team, sale, price))
+    return True
+
+
+QUALIFYING_SQUAD_SIZE = 18
+
+_KEEPER = Q(player__role__icontains="WICKET KEEPER") | Q(player__role__icontains="WK")
+_ALL_ROUNDER = Q(player__role__icontains="ALL ROUNDER")
+_BOWLER = Q(player__role__icontains="BOWLER")
+
+# Same buckets as role_category(), as SQL filters (first match wins)
+_ROLE_FILTERS = {
+    "wicket_keeper_count": _KEEPER,
+    "all_rounder_count": ~_KEEPER & _ALL_ROUNDER,
+    "bowler_count": ~_KEEPER & ~_ALL_ROUNDER & _BOWLER,
+    "batsman_count": ~_KEEPER & ~_ALL_ROUNDER & ~_BOWLER,
+}
+SQUAD_COUNT_FIELDS = ["squad_count", "overseas_count", *_ROLE_FILTERS]
+
+
+def squad_counts(room):
+    """
+    team -> {squad_count, overseas_count, <role>_count} for every team that
+    bought in the room, from the Auction rows in one GROUP BY query.
+    """
+    def players(condition=None):
+        return Count("player", filter=condition, distinct=True)
+
+    rows = (
+        Auction.objects.filter(room=room, is_finalized=True, participant__isnull=False)
+        .values("participant__team")
+        .annotate(
+            squad_count=players(),
+            overseas_count=players(~Q(player__country__iexact="india")),
+            **{field: players(condition) for field, condition in _ROLE_FILTERS.items()}
+        )
+        .order_by()
+    )
+    return {row.pop("participant__team"): row for row in rows}
+
+
+def settle_qualification(room):
+    """
+    Recount every participant's squad from the Auction rows and mark who
+    qualified, in one transaction. Returns the participants.
+    """
+    with transaction.atomic():
+        participants = list(Participant.objects.select_for_update().filter(room=room))
+        counts = squad_counts(room)
+        for participant in participants:
+            for field, value in counts.get(participant.team, dict.fromkeys(SQUAD_COUNT_FIELDS, 0)).items():
+                setattr(participant, field, value)
+            participant.is_qualified = participant.squad_count >= QUALIFYING_SQUAD_SIZE
+        Participant.objects.bulk_update(participants, [*SQUAD_COUNT_FIELDS, "is_qualified"])
+    return participants
+
+
+def default_lineup():
+    """Player ids in the standard auction order: by set, then by id"""
+    return list(Player.objects.order_by('set_no', 'id').values_list('id', flat=True))
+
+
+def set_lineup(room, player_ids):
+    """Fix the room's auction order (start of the auction) - caller saves the room"""
+    RoomLineup.objects.update_or_create(room=room, defaults={"player_ids": player_ids})
+    room.lineup_position = 0
+
+
+def lineup_ids(room):
+    """The room's lineup, or the default order before the auction has started"""
+    player_ids = RoomLineup.objects.filter(room=room).values_list('player_ids', flat=True).first()
+    return default_lineup() if player_ids is None else player_ids
+
+
+def move_to_next_player(room):
+    """Helper function to move auction to next player - one step along the room's lineup"""
+    if not room.current_player:
+        return False
+
+    player_ids = lineup_ids(room)
+    position = room.lineup_position + 1
+    next_player = None
+    while next_player is None and position < len(player_ids):
+        next_player = Player.objects.filter(id=player_ids[position]).first()  # None if deleted since
+        if next_player is None:
+            position += 1
+
+    # The lot is settled - its result must not carry over to the next one
+    room.sold_status = None
+    room.sold_at = None
+    room.sold_team = None
+    room.sold_price = None
+
+    if next_player:
+        room.current_player = next_player
+        room.lineup_position = position
+        room.current_bid = next_player.base_price
+        room.highest_bidder = None
+        restart_timer(room)
+        save_room(room)
+        return True
+    else:
+        # No more players - end auction
+        room.is_live = False
+        save_room(room)
+        return False
@@ -1,5 +1,18 @@
 from .ppi_calculator import calculate_ppi
 
+
+def role_category(role):
+    """Bucket a free-text role (specialism) into one of the composition roles"""
+    role = role.upper()
+    if "WICKET KEEPER" in role or "WK" in role:
+        return "WICKET KEEPER"
+    if "ALL ROUNDER" in role:
+        return "ALL ROUNDER"  # All rounder counts as half bat/half bowl for variety
+    if "BOWLER" in role:
+        return "BOWLER"
+    return "BATSMAN"
+
+
 def evaluate_team(playing_xi_list):
     """
     Evaluates a Playing XI (List of Player objects).
@@ -22,16 +35,7 @@ def evaluate_team(playing_xi_list):
         total_ppi += p_ppi
         
         # Count Roles
-        role = player.role.upper()
-        if "WICKET KEEPER" in role or "WK" in role:
-            role_counts["WICKET KEEPER"] += 1
-        elif "ALL ROUNDER" in role:
-            role_counts["ALL ROUNDER"] += 1
-            # All rounder counts as half bat/half bowl for variety
-        elif "BOWLER" in role:
-            role_counts["BOWLER"] += 1
-        else:
-            role_counts["BATSMAN"] += 1
+        role_counts[role_category(player.role)] += 1
             
     # --- Black Box Logic Penalties ---
     final_score = total_ppi
@@ -1,12 +1,36 @@
-from django.test import TestCase
+from django.test import TestCase, SimpleTestCase, TransactionTestCase
+from asgiref.testing import ApplicationCommunicator
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from decimal import Decimal
-from .models import Room, Player, Participant, Team, Auction, AuctionLog
+from unittest import mock
+from . import views
+from .models import Room, Player, Participant, Team, Auction, AuctionLog, Bid, ChatMessage
+from .services import room_events
+from .services.auction_clock import settle_due_rooms
+from .services.room_ops import (
+    StaleRoomError, move_to_next_player, remaining_seconds, save_room, save_room_if_unchanged
+)
+from .services import bid_ledger, metrics, room_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.utils import timezone
+from datetime import timedelta
+from auction_web.asgi import application
+import asyncio
+import json
+import re
+import threading
+import time
 
 class AuctionSystemTests(TestCase):
     def setUp(self):
+        cache.clear()
+        self.addCleanup(bid_ledger.flush_all)  # Don't leave buffered bids behind
         self.client = APIClient()
         
         # Setup basic data
@@ -43,6 +67,35 @@ class AuctionSystemTests(TestCase):
         res = self.client.post('/api/join-room/', {"code": self.room_code, "username": "Cheater", "team": "CSK"}, format='json')
         self.assertEqual(res.status_code, 409)  # Conflict
 
+    def test_lobby_lists_rooms_in_one_query_and_caches(self):
+        """Test the lobby is one annotated query, paginated, cached and refreshed on joins"""
+        self.client.post('/api/create-room/', {"host_name": "Other", "team": "RR", "is_public": True}, format='json')
+        self.client.post('/api/create-room/', {"host_name": "Hidden", "team": "KKR", "is_public": False}, format='json')
+
+        with self.assertNumQueries(1):
+            res = self.client.get('/api/rooms/?limit=1')
+        self.assertEqual([r["host"] for r in res.data["rooms"]], ["Other"])
+        self.assertEqual(res.data["rooms"][0]["host_team"], "RR")
+        self.assertIsNotNone(res.data["next_cursor"])
+
+        res = self.client.get(f'/api/rooms/?limit=1&cursor={res.data["next_cursor"]}')
+        self.assertEqual(res.data["rooms"][0]["code"], self.room_code)
+        self.assertEqual(res.data["rooms"][0]["player_count"], 2)
+        self.assertIsNone(res.data["next_cursor"])
+
+        with self.assertNumQueries(0):  # Cached page
+            self.client.get('/api/rooms/?limit=1')
+
+        self.client.post('/api/join-room/', {"code": self.room_code, "username": "Third", "team": "DC"}, format='json')
+        res = self.client.get('/api/rooms/')
+        counts = {r["code"]: r["player_count"] for r in res.data["rooms"]}
+        self.assertEqual(counts[self.room_code], 3)
+
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        res = self.client.get('/api/rooms/?status=live')
+        self.assertEqual([r["code"] for r in res.data["rooms"]], [self.room_code])
+        self.assertEqual(self.client.get('/api/rooms/?status=done').status_code, 400)
+
     # --- 2. AUCTION FLOW TESTS ---
     def test_start_auction(self):
         """Test starting auction sets initial state"""
@@ -59,21 +112,21 @@ class AuctionSystemTests(TestCase):
         self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
         
         # Place valid bid
-        bid_data = {"code": self.room_code, "team": "MI", "amount": 220}
+        bid_data = {"code": self.room_code, "team": "MI", "amount": 200}
         res = self.client.post('/api/place-bid/', bid_data, format='json')
         self.assertEqual(res.status_code, 200)
         
         self.room.refresh_from_db()
-        self.assertEqual(self.room.current_bid, 220)
+        self.assertEqual(self.room.current_bid, 200)
         self.assertEqual(self.room.highest_bidder, "MI")
-        self.assertEqual(self.room.timer, 15)  # Timer reset
+        self.assertAlmostEqual(remaining_seconds(self.room), 15, delta=1)  # Timer reset
 
     def test_place_bid_insufficient_budget(self):
         """Test preventing bid over budget"""
         self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
         
         # Set budget to low
-        self.joiner.budget = Decimal('1.00') # 1 Cr = 100 Lakhs
+        self.joiner.purse = 100  # 1 Cr = 100 Lakhs
         self.joiner.save()
         
         # Bid 200 Lakhs
@@ -82,12 +135,184 @@ class AuctionSystemTests(TestCase):
         self.assertEqual(res.status_code, 403)
         self.assertIn("Insufficient budget", res.data['error'])
 
+    def test_place_bid_outbid_conflict(self):
+        """Test a bid that no longer beats the current bid gets a 409 with the next amount"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+
+        res = self.client.post('/api/place-bid/', {"code": self.room_code, "team": "CSK", "amount": 200}, format='json')
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.data['highest_bidder'], "MI")
+        self.assertEqual(res.data['retry_with'], 220)
+        self.assertIn("retry with 220", res.data['error'])
+
+    def test_bid_next_losing_race_is_told_outbid(self):
+        """Test bid-next doesn't silently bid a higher step when a rival got in first"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        real_save = views.save_room_if_unchanged
+
+        def rival_first(room, fields):
+            # CSK's 200 lands between MI reading the room and saving its first try
+            if rival_first.pending:
+                rival_first.pending = False
+                Room.objects.filter(pk=room.pk).update(
+                    current_bid=200, highest_bidder="CSK", version=F('version') + 1
+                )
+            return real_save(room, fields)
+        rival_first.pending = True
+
+        with mock.patch.object(views, "save_room_if_unchanged", side_effect=rival_first):
+            res = self.client.post('/api/bid-next/', {"code": self.room_code, "team": "MI"}, format='json')
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual((res.data['highest_bidder'], res.data['retry_with']), ("CSK", 220))
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.current_bid, self.room.highest_bidder), (200, "CSK"))
+
+    def test_stale_room_copy_cannot_overwrite_a_bid(self):
+        """Test save_room refuses a copy read before a bid instead of wiping the bid"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        stale = Room.objects.get(pk=self.room.pk)
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+
+        stale.is_paused = True
+        with self.assertRaises(StaleRoomError):
+            save_room(stale)
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.highest_bidder, self.room.version), ("MI", stale.version + 1))
+        self.assertFalse(self.room.is_paused)
+
+        # The views lock the row and save a fresh copy
+        res = self.client.post('/api/pause-auction/', {"code": self.room_code}, format='json')
+        self.assertTrue(res.data['is_paused'])
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.highest_bidder, "MI")
+
+    def test_bid_after_deadline_is_rejected(self):
+        """Test a late bid can't bring an expired lot back to life"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        Room.objects.filter(pk=self.room.pk).update(deadline_at=timezone.now() - timedelta(seconds=30))
+
+        res = self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+        self.assertEqual(res.status_code, 409)
+        self.room.refresh_from_db()
+        self.assertIsNone(self.room.highest_bidder)
+        self.assertLess(self.room.deadline_at, timezone.now())
+
+    def test_bid_after_auction_ended_is_rejected(self):
+        """Test the last player can't be bid on (and sold again) once the auction is over"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/end-auction/', {"code": self.room_code}, format='json')
+
+        res = self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+        self.assertEqual(res.status_code, 409)
+        res = self.client.post('/api/bid-next/', {"code": self.room_code, "team": "CSK"}, format='json')
+        self.assertEqual(res.status_code, 409)
+        self.room.refresh_from_db()
+        self.assertIsNone(self.room.highest_bidder)
+
+    def test_place_bid_follows_ladder(self):
+        """Test only the next step of the ladder is accepted, and bid-next works it out"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        state = self.client.get(f'/api/room-state/{self.room_code}/').data
+        self.assertEqual(state['next_bid'], 200)  # Opening bid is the base price
+
+        res = self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 230}, format='json')
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.data['retry_with'], 200)
+
+        res = self.client.post('/api/bid-next/', {"code": self.room_code, "team": "MI"}, format='json')
+        self.assertEqual(res.data['amount'], 200)
+        res = self.client.post('/api/bid-next/', {"code": self.room_code, "team": "CSK"}, format='json')
+        self.assertEqual(res.data['amount'], 220)
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.current_bid, self.room.highest_bidder), (220, "CSK"))
+
+    def test_bid_stage_timings(self):
+        """Test bid stage timings are only collected when enabled"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        metrics.reset()
+        self.client.post('/api/bid-next/', {"code": self.room_code, "team": "MI"}, format='json')
+        self.assertNotIn('bid.save_ms', metrics.gauges())
+
+        with self.settings(AUCTION_BID_TIMINGS=True), self.assertLogs('auction.views', 'DEBUG') as logs:
+            self.client.post('/api/bid-next/', {"code": self.room_code, "team": "CSK"}, format='json')
+        gauges = metrics.gauges()
+        for stage in ("lookup", "validation", "save", "log_insert", "total"):
+            self.assertIn(f'bid.{stage}_ms', gauges)
+        self.assertEqual(metrics.counters()['bid.timed'], 1)
+        self.assertIn("Bid accepted", logs.output[-1])
+
+    def test_duplicate_bid_replayed_without_queries(self):
+        """Test a double-clicked bid gets the original answer straight from the cache"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        bid = {"code": self.room_code, "team": "MI", "amount": 200}
+        first = self.client.post('/api/place-bid/', bid, format='json')
+        with self.assertNumQueries(0):
+            again = self.client.post('/api/place-bid/', bid, format='json')
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.data['message'], first.data['message'])
+        self.assertEqual(again['Idempotent-Replayed'], "true")
+
+    def test_sell_with_idempotency_key_runs_once(self):
+        """Test a retried sell with the same Idempotency-Key doesn't sell the next player too"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/bid-next/', {"code": self.room_code, "team": "MI"}, format='json')
+        for _ in range(2):
+            self.client.post('/api/sell-player/', {"code": self.room_code}, format='json',
+                             headers={"Idempotency-Key": "sell-1"})
+        self.assertEqual(Auction.objects.filter(room=self.room, is_finalized=True).count(), 1)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.current_player, self.player2)
+
+    def test_selling_the_next_lot_is_not_a_duplicate(self):
+        """Test a sell of the next lot isn't replayed, while a repeat naming the same lot is"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        sell = {"code": self.room_code, "player_id": self.player1.id}
+        self.client.post('/api/sell-player/', sell, format='json')
+        again = self.client.post('/api/sell-player/', sell, format='json')
+        self.assertEqual(again['Idempotent-Replayed'], "true")
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.current_player, self.player2)
+
+        res = self.client.post('/api/sell-player/', {"code": self.room_code}, format='json')
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.room.refresh_from_db()
+        self.assertFalse(self.room.is_live)  # Player B was the last lot
+        res = self.client.post('/api/skip-player/', {"code": self.room_code, "player_id": self.player1.id}, format='json')
+        self.assertEqual(res.status_code, 409)
+
+    def test_bid_rate_limited_per_team(self):
+        """Test a team's bid burst beyond the bucket is answered 429 without touching the room"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        with self.settings(AUCTION_BID_RATE=0.001, AUCTION_BID_BURST=2):
+            statuses = [
+                self.client.post('/api/bid-next/', {"code": self.room_code, "team": "MI"}, format='json').status_code
+                for _ in range(3)
+            ]
+            self.assertEqual(statuses, [200, 403, 429])  # 403: already highest bidder
+            res = self.client.post('/api/bid-next/', {"code": self.room_code, "team": "CSK"}, format='json')
+            self.assertEqual(res.status_code, 200)  # Other teams have their own bucket
+
+    def test_bid_compare_and_swap(self):
+        """Test a bid computed from a stale read is not written over a newer one"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        stale = Room.objects.get(code=self.room_code)
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+
+        stale.current_bid = 200
+        stale.highest_bidder = "CSK"
+        self.assertFalse(save_room_if_unchanged(stale, ["current_bid", "highest_bidder"]))
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.highest_bidder, "MI")
+
     # --- 3. SELLING & SQUADS ---
     def test_sell_player_updates_state(self):
         """Test selling logic updates squad and budget"""
         self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
         
-        # MI Bids 500L (5Cr)
+        # CSK opens at the 200L base price, MI bids 220L, 240L... up to 500L (5Cr)
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "CSK", "amount": 200}, format='json')
+        Room.objects.filter(code=self.room_code).update(current_bid=480, highest_bidder="CSK")
         self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 500}, format='json')
         
         # Sell
@@ -97,7 +322,8 @@ class AuctionSystemTests(TestCase):
         auction = Auction.objects.filter(room=self.room, is_finalized=True).first()
         self.assertIsNotNone(auction)
         self.assertEqual(auction.price, 500)
-        self.assertEqual(auction.team.name, "MI")
+        self.assertEqual(auction.participant, self.joiner)
+        self.assertIsNone(auction.team)  # No global Team rows any more
         
         # Verify Participant Update
         self.joiner.refresh_from_db()
@@ -109,6 +335,219 @@ class AuctionSystemTests(TestCase):
         self.room.refresh_from_db()
         self.assertEqual(self.room.current_player, self.player2)
         
+    def test_sale_never_overdraws_purse(self):
+        """Test the guarded deduction refuses a sale the purse no longer covers"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+        Participant.objects.filter(pk=self.joiner.pk).update(purse=150)  # Spent elsewhere meanwhile
+
+        self.client.post('/api/sell-player/', {"code": self.room_code}, format='json')
+        self.joiner.refresh_from_db()
+        self.assertEqual((self.joiner.purse, self.joiner.spent, self.joiner.squad_count), (150, 0, 0))
+        self.assertFalse(Auction.objects.filter(room=self.room, participant=self.joiner).exists())
+
+    def test_purchase_names_its_buyer(self):
+        """Test a sale's string form shows the participant who bought the player"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+        self.client.post('/api/sell-player/', {"code": self.room_code}, format='json')
+        auction = Auction.objects.get(room=self.room, is_finalized=True)
+        self.assertEqual(str(auction), f"{self.player1} -> MI for 200")
+
+    def test_sale_updates_composition_counters(self):
+        """Test a sale bumps the overseas and role counters used by bid checks"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        # Player B (Australia, BOWL) is up
+        Room.objects.filter(code=self.room_code).update(current_player=self.player2, current_bid=100)
+        self.client.post('/api/bid-next/', {"code": self.room_code, "team": "MI"}, format='json')
+        self.client.post('/api/sell-player/', {"code": self.room_code}, format='json')
+        self.joiner.refresh_from_db()
+        self.assertEqual(self.joiner.squad_count, 1)
+        self.assertEqual(self.joiner.overseas_count, 1)
+        self.assertEqual(self.joiner.batsman_count, 1)  # "BOWL" isn't a BOWLER specialism
+
+        res = self.client.get(f'/api/check-qualification/{self.room_code}/')
+        mi = next(row for row in res.data if row['team'] == "MI")
+        self.assertEqual(mi['overseas'], 1)
+
+    def test_end_auction_recounts_squads_in_bulk(self):
+        """Test qualification is settled from one aggregate, fixing drifted counters"""
+        players = [
+            Player.objects.create(name=f"Keeper {i}", role="WK-Batsman", base_price=20, country="India", set_no=2)
+            for i in range(18)
+        ]
+        Auction.objects.bulk_create(
+            Auction(room=self.room, player=p, participant=self.joiner, price=20, is_finalized=True) for p in players
+        )
+        Participant.objects.filter(pk=self.host.pk).update(squad_count=20)  # Drifted
+
+        res = self.client.get(f'/api/check-qualification/{self.room_code}/')
+        rows = {row['team']: row for row in res.data}
+        self.assertEqual(rows["MI"]['status'], "QUALIFIED")
+        self.assertEqual(rows["MI"]['composition']['WICKET KEEPER'], 18)
+        self.assertEqual(rows["CSK"]['status'], "DISQUALIFIED")
+
+        # lock room, save, lock participants, aggregate, one bulk UPDATE (+ 2 savepoints, releases)
+        with self.assertNumQueries(9):
+            res = self.client.post('/api/end-auction/', {"code": self.room_code}, format='json')
+        self.assertEqual(res.data['qualified_count'], 1)
+        self.host.refresh_from_db()
+        self.joiner.refresh_from_db()
+        self.assertEqual((self.host.squad_count, self.host.is_qualified), (0, False))
+        self.assertEqual((self.joiner.squad_count, self.joiner.wicket_keeper_count), (18, 18))
+        self.assertTrue(self.joiner.is_qualified)
+
+    def test_overseas_limit_uses_counter(self):
+        """Test the overseas limit is checked from the participant counter"""
+        Participant.objects.filter(pk=self.joiner.pk).update(overseas_count=8)
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        Room.objects.filter(code=self.room_code).update(current_player=self.player2, current_bid=100)
+        res = self.client.post('/api/bid-next/', {"code": self.room_code, "team": "MI"}, format='json')
+        self.assertEqual(res.status_code, 403)
+        self.assertIn("Overseas", res.data['error'])
+
+    def test_bid_ledger_flushed_by_age_without_further_bids(self):
+        """Test the last lot's bids are written once they are old, even if nobody bids again"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+        self.assertTrue(bid_ledger._flusher.is_alive())  # Background flusher is running
+
+        self.assertEqual(bid_ledger.flush_due(), 0)  # Not old yet
+        with self.settings(AUCTION_BID_LEDGER_MAX_AGE=0):
+            self.assertEqual(bid_ledger.flush_due(), 1)
+        self.assertEqual(bid_ledger.pending(self.room_code), [])
+        self.assertEqual(Bid.objects.filter(room=self.room).count(), 1)
+
+    def test_bid_ledger_written_on_settlement(self):
+        """Test bids are buffered, then written in one batch when the lot is sold"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/bid-next/', {"code": self.room_code, "team": "MI"}, format='json')
+            self.client.post('/api/bid-next/', {"code": self.room_code, "team": "CSK"}, format='json')
+        self.assertFalse(Bid.objects.exists())
+        self.assertEqual(len(bid_ledger.pending(self.room_code)), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/sell-player/', {"code": self.room_code}, format='json')
+        bids = list(Bid.objects.filter(room=self.room, player=self.player1))
+        self.assertEqual([(b.team, b.amount) for b in bids], [("MI", 200), ("CSK", 220)])
+        self.assertLess(bids[0].sequence, bids[1].sequence)
+        self.assertEqual(bid_ledger.pending(self.room_code), [])
+
+    def test_proxy_bids_resolve_bidding_war(self):
+        """Test competing proxy maximums are played out server-side in one go"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        url = '/api/proxy-bid/'
+        res = self.client.post(url, {"code": self.room_code, "team": "MI", "max_amount": 300}, format='json')
+        self.assertEqual(res.data['proxy_bids'], 1)  # Opens at the base price
+
+        res = self.client.post(url, {"code": self.room_code, "team": "CSK", "max_amount": 260}, format='json')
+        self.assertEqual(res.data['proxy_bids'], 4)
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.current_bid, self.room.highest_bidder), (280, "MI"))
+        ledger = [(b.team, b.amount) for b in bid_ledger.pending(self.room_code)]
+        self.assertEqual(ledger, [("MI", 200), ("CSK", 220), ("MI", 240), ("CSK", 260), ("MI", 280)])
+        self.assertEqual(len({b.sequence for b in bid_ledger.pending(self.room_code)}), 5)
+
+        # A human bid above the proxy's max is left standing
+        res = self.client.post('/api/bid-next/', {"code": self.room_code, "team": "CSK"}, format='json')
+        self.assertEqual((res.data['amount'], res.data['proxy_bids']), (300, 0))
+
+    def test_proxy_bid_after_deadline_does_not_bid(self):
+        """Test a proxy set on an expired, unsettled lot doesn't bid or restart the timer"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        expired = timezone.now() - timedelta(seconds=30)
+        Room.objects.filter(pk=self.room.pk).update(deadline_at=expired)
+
+        res = self.client.post('/api/proxy-bid/', {"code": self.room_code, "team": "MI", "max_amount": 300}, format='json')
+        self.assertEqual(res.data['proxy_bids'], 0)
+        self.room.refresh_from_db()
+        self.assertIsNone(self.room.highest_bidder)
+        self.assertEqual(self.room.deadline_at, expired)
+
+    def test_proxy_bid_for_upcoming_player(self):
+        """Test a proxy registered for a later player bids as soon as it comes up"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        res = self.client.post('/api/proxy-bid/', {
+            "code": self.room_code, "team": "MI", "max_amount": 150, "player_id": self.player2.id
+        }, format='json')
+        self.assertEqual(res.data['proxy_bids'], 0)
+
+        self.client.post('/api/sell-player/', {"code": self.room_code}, format='json')
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.current_player, self.player2)
+        self.assertEqual((self.room.current_bid, self.room.highest_bidder), (100, "MI"))
+
+        res = self.client.post('/api/proxy-bid/', {"code": self.room_code, "team": "CSK", "max_amount": 50}, format='json')
+        self.assertEqual(res.status_code, 400)  # Below base price
+
+        res = self.client.post('/api/proxy-bid/', {
+            "code": self.room_code, "team": "CSK", "max_amount": 150, "player_id": "abc"
+        }, format='json')
+        self.assertEqual(res.status_code, 400)
+
+    def test_custom_lineup_drives_next_player(self):
+        """Test a room auctions players in its own lineup order"""
+        player3 = Player.objects.create(name="Player C", role="WK", base_price=50, country="India", set_no=2)
+        lineup = [player3.id, self.player2.id, self.player1.id]
+        self.client.post('/api/start-auction/', {"code": self.room_code, "lineup": lineup}, format='json')
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.current_player, player3)
+
+        res = self.client.get(f'/api/upcoming-players/{self.room_code}/')
+        self.assertEqual([p['id'] for p in res.data['players']], [self.player2.id, self.player1.id])
+
+        with self.assertNumQueries(3):  # Lineup row, next player by id, room save
+            move_to_next_player(self.room)
+        self.assertEqual(self.room.current_player, self.player2)
+        self.assertEqual(self.room.lineup_position, 1)
+
+    def test_upcoming_players_paginated_and_cached(self):
+        """Test upcoming players come in cursor pages, cached until the lot moves on"""
+        for i in range(3):
+            Player.objects.create(name=f"Extra {i}", role="BAT", base_price=50, country="India", set_no=2)
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        url = f'/api/upcoming-players/{self.room_code}/'
+
+        first = self.client.get(url, {"limit": 2}).data
+        self.assertEqual(first['remaining'], 4)
+        self.assertEqual(first['players'][0]['id'], self.player2.id)
+        second = self.client.get(url, {"limit": 2, "cursor": first['next_cursor']}).data
+        self.assertEqual(len(second['players']), 2)
+        self.assertIsNone(second['next_cursor'])
+
+        with self.assertNumQueries(1):  # Only the room version check (locmem cache)
+            self.client.get(url, {"limit": 2})
+
+        self.client.post('/api/sell-player/', {"code": self.room_code}, format='json')
+        res = self.client.get(url, {"limit": 2}).data
+        self.assertEqual(res['remaining'], 3)
+        self.assertNotEqual(res['players'][0]['id'], self.player2.id)
+
+    def test_summary_read_model_and_304(self):
+        """Test the summary is served from the squads read model, rolled forward on a sale"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        url = f'/api/summary/{self.room_code}/'
+        res = self.client.get(url)
+        etag = res['ETag']
+        self.assertEqual(res.status_code, 200)
+
+        with self.assertNumQueries(1):  # Only the room version check (locmem cache)
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        self.client.post('/api/bid-next/', {"code": self.room_code, "team": "MI"}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/sell-player/', {"code": self.room_code}, format='json')
+
+        metrics.reset()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(metrics.counters().get('squads_cache.hit'), 1)  # No rebuild
+        mi = next(row for row in res.data if row['team'] == "MI")
+        self.assertEqual(mi['players'][0]['id'], self.player1.id)
+        self.assertEqual(mi['budget_remaining'], 118.0)
+
     def test_skip_player(self):
         """Test skipping logic"""
         self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
@@ -121,3 +560,512 @@ class AuctionSystemTests(TestCase):
         # Verify Log
         log = AuctionLog.objects.filter(room=self.room, message__contains="SKIPPED").exists()
         self.assertTrue(log)
+
+    # --- 4. STATE SYNC ---
+    def test_mutations_bump_room_version(self):
+        """Test every mutation moves the room version forward"""
+        self.room.refresh_from_db()
+        before = self.room.version
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+        self.client.post('/api/pause-auction/', {"code": self.room_code}, format='json')
+
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.version, before + 3)
+
+    def test_room_state_conditional_get(self):
+        """Test unchanged room state is answered with 304 without touching the database"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/pause-auction/', {"code": self.room_code}, format='json')  # freeze timer
+
+        res = self.client.get(f'/api/room-state/{self.room_code}/', {"team": "MI"})
+        self.assertEqual(res.status_code, 200)
+        etag = res['ETag']
+
+        with self.assertNumQueries(1):  # Only the room version check (locmem cache)
+            res = self.client.get(f'/api/room-state/{self.room_code}/', {"team": "MI"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        # A bid changes the version, so the old ETag no longer matches
+        self.client.post('/api/pause-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+        res = self.client.get(f'/api/room-state/{self.room_code}/', {"team": "MI"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['highest_bidder'], "MI")
+
+    def test_cached_state_sees_writes_from_other_processes(self):
+        """Test a write that never reached this process's cache (e.g. the clock) is not hidden"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        url = f'/api/room-state/{self.room_code}/'
+        etag = self.client.get(url)['ETag']
+
+        # The auction clock moving to the next player in its own process
+        Room.objects.filter(pk=self.room.pk).update(current_player=self.player2, version=F('version') + 3)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['current_player']['id'], self.player2.id)
+
+        # ...and a late, older write can't move the cached version back
+        room_cache.set_version(self.room_code, res.data['version'] - 1)
+        self.assertEqual(self.client.get(url).data['version'], res.data['version'])
+
+    def test_room_state_served_from_cache(self):
+        """Test a steady-state poll runs no SQL (one version check on locmem) and mutations refresh the snapshot"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.get(f'/api/room-state/{self.room_code}/', {"team": "MI"})  # warm
+
+        metrics.reset()
+        with self.assertNumQueries(1):  # locmem cache + in-memory broadcast: confirm the version
+            self.client.get(f'/api/room-state/{self.room_code}/', {"team": "MI"})
+        with mock.patch.object(room_cache, "is_process_local", return_value=False), self.assertNumQueries(0):
+            res = self.client.get(f'/api/room-state/{self.room_code}/', {"team": "MI"})
+        self.assertEqual(res.data['user_budget'], Decimal('120.00'))
+        self.assertEqual(res.data['players_joined'], 2)
+        self.assertEqual(metrics.counters()['room_state_cache.hit'], 2)
+
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+        res = self.client.get(f'/api/room-state/{self.room_code}/', {"team": "MI"})
+        self.assertEqual(res.data['current_bid'], 200)
+        self.assertEqual(metrics.counters()['room_state_cache.miss'], 1)
+
+        res = self.client.get('/api/metrics/')
+        self.assertIn('room_state_cache.hit', res.data['counters'])
+
+    def test_room_state_delta_since_version(self):
+        """Test a client that knows the previous version only gets the changed fields"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        url = f'/api/room-state/{self.room_code}/'
+        base = self.client.get(url).data['version']
+
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+        res = self.client.get(url, {"since": base, "delta": 1, "team": "MI"})
+        self.assertTrue(res.data['delta'])
+        changes = res.data['changes']
+        self.assertEqual(changes['next_bid'], 220)
+        self.assertNotIn('current_bid', changes)  # Opening bid matched the base price
+        self.assertEqual(changes['highest_bidder'], "MI")
+        self.assertNotIn('current_player', changes)
+        self.assertEqual(res.data['user_budget'], Decimal('120.00'))
+
+        # Unknown (too old) versions fall back to a full snapshot
+        res = self.client.get(url, {"since": 0, "delta": 1})
+        self.assertFalse(res.data['delta'])
+        self.assertEqual(res.data['current_player']['id'], self.player1.id)
+
+    def test_next_poll_ms_hint(self):
+        """Test idle, paused and busy rooms get longer poll intervals than a running lot"""
+        url = f'/api/room-state/{self.room_code}/'
+        metrics.reset()
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        bidding = self.client.get(url).data['next_poll_ms']
+
+        self.client.post('/api/pause-auction/', {"code": self.room_code}, format='json')
+        paused = self.client.get(url).data['next_poll_ms']
+        self.assertGreater(paused, bidding)
+
+        Room.objects.filter(code=self.room_code).update(status='SELECTION', version=F('version') + 1)
+        cache.clear()
+        idle = self.client.get(url).data['next_poll_ms']
+        self.assertGreater(idle, paused)
+
+        # A slow worker asks clients to back off
+        metrics.observe("request_latency_ms", settings.AUCTION_POLL_LATENCY_TARGET_MS * 100)
+        res = self.client.get(url)
+        self.assertGreater(res.data['next_poll_ms'], idle)
+        self.assertIn('request_latency_ms', self.client.get('/api/metrics/').data['gauges'])
+
+    def test_quiet_dashboard_tick_skips_chat_and_log_queries(self):
+        """Test a room with no chat (or whose heads expired) stops querying after one tick"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        url = f'/api/dashboard/{self.room_code}/'
+        cursors = self.client.get(url, {"team": "MI"}).data['cursors']
+
+        with mock.patch.object(room_cache, "is_process_local", return_value=False):  # Shared cache
+            self.client.get(url, {"team": "MI", **cursors})
+            for _ in range(2):
+                with self.assertNumQueries(0):
+                    res = self.client.get(url, {"team": "MI", **cursors})
+                self.assertEqual(set(res.data), {"cursors"})
+                cache.clear()  # Heads expired
+                self.client.get(url, {"team": "MI", **cursors})
+
+            # A bogus cursor from one client can't hide rows from the others
+            ChatMessage.objects.create(room=self.room, sender="Joiner", message="hi")
+            cache.clear()
+            self.client.get(url, {"team": "MI", **cursors, "chat": 10 ** 9})
+            res = self.client.get(url, {"team": "MI", **cursors})
+            self.assertEqual(res.data['chat'][0]['message'], "hi")
+
+    def test_dashboard_sees_logs_from_other_processes(self):
+        """Test rows written where this process's cache can't hear (e.g. the clock) aren't hidden"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        url = f'/api/dashboard/{self.room_code}/'
+        cursors = self.client.get(url, {"team": "MI"}).data['cursors']
+        self.client.get(url, {"team": "MI", **cursors})
+
+        AuctionLog.objects.create(room=self.room, message="Player A UNSOLD")  # No event reaches us
+        res = self.client.get(url, {"team": "MI", **cursors})
+        self.assertEqual(res.data['logs'][-1]['message'], "Player A UNSOLD")
+
+    def test_dashboard_returns_only_changed_sections(self):
+        """Test the batched endpoint sends everything once, then only what changed"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+            self.client.post('/api/send-message/', {"code": self.room_code, "sender": "Joiner", "message": "hi"}, format='json')
+
+        url = f'/api/dashboard/{self.room_code}/'
+        res = self.client.get(url, {"team": "MI"})
+        for section in ("state", "chat", "logs", "summary", "my_team"):
+            self.assertIn(section, res.data)
+        self.assertEqual(res.data['chat'][0]['message'], "hi")
+
+        cursors = res.data['cursors']
+        with self.assertNumQueries(3):  # Room version check, chat and logs (locmem cache)
+            res = self.client.get(url, {"team": "MI", **cursors})
+        self.assertEqual(set(res.data), {"cursors"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+            self.client.post('/api/sell-player/', {"code": self.room_code}, format='json')
+        res = self.client.get(url, {"team": "MI", **cursors})
+        self.assertNotIn("chat", res.data)
+        self.assertEqual(res.data['state']['current_player']['id'], self.player2.id)
+        self.assertEqual(res.data['my_team'][0]['price'], 200)
+        mi = [t for t in res.data['summary'] if t['team'] == "MI"][0]
+        self.assertEqual(mi['budget_remaining'], 118.0)
+
+    # --- 5. AUCTION CLOCK ---
+    def _expire_timer(self, seconds_ago=20):
+        Room.objects.filter(pk=self.room.pk).update(
+            deadline_at=timezone.now() - timedelta(seconds=seconds_ago)
+        )
+
+    def test_room_state_read_does_not_settle(self):
+        """Test polling an expired lot no longer writes anything"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self._expire_timer()
+        self.room.refresh_from_db()
+
+        res = self.client.get(f'/api/room-state/{self.room_code}/')
+        self.assertEqual(res.data['timer'], 0)
+        self.assertIsNone(res.data['sold_status'])
+        self.assertEqual(Room.objects.get(pk=self.room.pk).version, self.room.version)
+
+    def test_clock_settles_expired_lot(self):
+        """Test the clock marks SOLD, then finalizes and moves on after the display delay"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+        self._expire_timer()
+
+        self.assertEqual(settle_due_rooms(), 1)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.sold_status, "SOLD")
+        self.assertEqual(self.room.sold_team, "MI")
+        self.assertFalse(Auction.objects.filter(room=self.room).exists())
+
+        Room.objects.filter(pk=self.room.pk).update(sold_at=timezone.now() - timedelta(seconds=2))
+        settle_due_rooms()
+        self.room.refresh_from_db()
+        self.assertIsNone(self.room.sold_status)
+        self.assertEqual(self.room.current_player, self.player2)
+        self.assertEqual(Auction.objects.get(room=self.room, is_finalized=True).price, 200)
+
+        # Nothing else is due - a second pass is a no-op
+        self.assertEqual(settle_due_rooms(), 0)
+
+    def test_sell_during_result_display_settles_once(self):
+        """Test clicking Sell while the clock's SOLD is on screen doesn't settle the lot twice"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+        self._expire_timer()
+        settle_due_rooms()  # Marks SOLD to MI
+
+        self.assertEqual(self.client.post('/api/skip-player/', {"code": self.room_code}, format='json').status_code, 409)
+        self.client.post('/api/sell-player/', {"code": self.room_code}, format='json')
+        Room.objects.filter(pk=self.room.pk).update(sold_at=timezone.now() - timedelta(seconds=2))
+        settle_due_rooms()
+
+        self.room.refresh_from_db()
+        self.joiner.refresh_from_db()
+        self.assertEqual((self.joiner.squad_count, self.joiner.purse), (1, 11800))
+        self.assertEqual(Auction.objects.filter(room=self.room, is_finalized=True).count(), 1)
+        self.assertEqual(self.room.current_player, self.player2)
+        self.assertIsNone(self.room.sold_status)
+        self.assertIsNone(self.room.highest_bidder)
+
+    def test_pause_freezes_and_resume_restores_deadline(self):
+        """Test pausing stores the remaining time and resuming turns it back into a deadline"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        Room.objects.filter(pk=self.room.pk).update(deadline_at=timezone.now() + timedelta(seconds=9.5))
+
+        res = self.client.post('/api/pause-auction/', {"code": self.room_code}, format='json')
+        self.assertEqual(res.data['timer'], 10)
+        self.room.refresh_from_db()
+        self.assertIsNone(self.room.deadline_at)
+        self.assertAlmostEqual(self.room.paused_remaining, 9.5, delta=0.5)
+
+        self.client.post('/api/pause-auction/', {"code": self.room_code}, format='json')
+        self.room.refresh_from_db()
+        self.assertIsNone(self.room.paused_remaining)
+        self.assertAlmostEqual((self.room.deadline_at - timezone.now()).total_seconds(), 9.5, delta=0.5)
+
+    def test_room_state_returns_deadline_and_server_time(self):
+        """Test clients get what they need to count down locally"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        res = self.client.get(f'/api/room-state/{self.room_code}/')
+        self.assertIsNotNone(res.data['deadline_at'])
+        self.assertIsNotNone(res.data['server_time'])
+        self.assertEqual(res.data['timer'], 15)
+
+    def test_bid_publishes_events(self):
+        """Test a bid is pushed to the room's event buffer"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        last_id = room_events.latest_event_id(self.room_code)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/place-bid/', {"code": self.room_code, "team": "MI", "amount": 200}, format='json')
+
+        events = room_events.events_since(self.room_code, last_id)
+        bid = [e for e in events if e["event"] == "bid"]
+        self.assertEqual(bid[0]["data"]["amount"], 200)
+        self.assertIn("log", [e["event"] for e in events])
+
+
+class QueryPlanTests(TestCase):
+    """The hot queries must be answered from an index, not a full table scan"""
+
+    def setUp(self):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            self.skipTest("Query plans are only checked on SQLite and PostgreSQL")
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")  # Tiny test tables - force the index if there is one
+        self.room = Room.objects.create(code="PLAN1", host_name="Host")
+        self.participant = Participant.objects.create(room=self.room, username="Owner", team="MI")
+
+    def assertNoFullScan(self, queryset, table):
+        plan = queryset.explain()
+        if connection.vendor == "postgresql":
+            full_scan = f"Seq Scan on {table}" in plan
+        else:
+            full_scan = re.search(rf"\bSCAN {table}\b", plan) is not None
+        self.assertFalse(full_scan, f"Full scan of {table}:\n{plan}")
+
+    def test_hot_queries_use_indexes(self):
+        self.assertNoFullScan(
+            Player.objects.filter(set_no__gt=1).order_by('set_no', 'id'), "auction_player"
+        )
+        self.assertNoFullScan(
+            Auction.objects.filter(room=self.room, participant=self.participant, is_finalized=True),
+            "auction_auction"
+        )
+        self.assertNoFullScan(
+            Auction.objects.filter(room=self.room, status__in=['UNSOLD', 'SKIPPED']), "auction_auction"
+        )
+        for status, cursor in ((None, 0), ("LIVE", 100)):  # Lobby: first and later pages
+            lobby = views.lobby_rooms(status, cursor)[:settings.AUCTION_LOBBY_PAGE_SIZE + 1]
+            self.assertNoFullScan(lobby, "auction_room")
+            self.assertNoFullScan(lobby, "auction_participant")
+        self.assertNoFullScan(
+            Participant.objects.filter(room=self.room, is_qualified=True).order_by('-final_score'),
+            "auction_participant"
+        )
+
+
+class RoomEventHubTests(SimpleTestCase):
+    def test_unknown_or_expired_event_id_needs_resync(self):
+        """Test ids from another process or outside the buffer cannot resume"""
+        self.assertIsNone(room_events.events_since("HUB1", "deadbeef-1"))
+
+        first = room_events.publish_event("HUB1", "log", {})
+        for _ in range(room_events.BUFFER_SIZE + 1):
+            room_events.publish_event("HUB1", "log", {})
+        self.assertIsNone(room_events.events_since("HUB1", first["id"]))
+
+        latest = room_events.latest_event_id("HUB1")
+        self.assertEqual(room_events.events_since("HUB1", latest), [])
+
+
+class RoomSocketTests(TransactionTestCase):
+    def setUp(self):
+        self.addCleanup(bid_ledger.flush_all)
+        Player.objects.create(name="Player A", role="BAT", base_price=200, country="India", set_no=1)
+        self.client = APIClient()
+        res = self.client.post('/api/create-room/', {"host_name": "HostUser", "team": "CSK"}, format='json')
+        self.room_code = res.data['code']
+        self.client.post('/api/join-room/', {"code": self.room_code, "username": "Joiner", "team": "MI"}, format='json')
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+
+    def _connect(self, code):
+        return ApplicationCommunicator(application, {
+            "type": "websocket",
+            "path": f"/ws/room/{code}/",
+            "query_string": b"",
+        })
+
+    async def test_bid_over_websocket_is_pushed_back(self):
+        """Test a bid sent on the socket is applied, answered and broadcast"""
+        socket = self._connect(self.room_code)
+        await socket.send_input({"type": "websocket.connect"})
+        self.assertEqual((await socket.receive_output(1))["type"], "websocket.accept")
+
+        await socket.send_input({
+            "type": "websocket.receive",
+            "text": json.dumps({"action": "bid", "team": "MI", "amount": 200, "ref": 1}),
+        })
+        frames = []
+        while not {"bid", "bid_result"} <= {f["event"] for f in frames}:
+            frames.append(json.loads((await socket.receive_output(2))["text"]))
+
+        result = [f for f in frames if f["event"] == "bid_result"][0]
+        self.assertEqual(result["status"], 200)
+        self.assertEqual(result["ref"], 1)
+
+        await socket.send_input({"type": "websocket.disconnect", "code": 1000})
+        await socket.wait(1)
+
+    async def _result(self, socket, message):
+        await socket.send_input({"type": "websocket.receive", "text": json.dumps(message)})
+        while True:
+            frame = json.loads((await socket.receive_output(2))["text"])
+            if frame["event"] in ("bid_result", "error"):
+                return frame
+
+    async def test_socket_bids_are_guarded(self):
+        """Test socket bids are deduplicated and rate limited, and bad frames don't close the socket"""
+        socket = self._connect(self.room_code)
+        await socket.send_input({"type": "websocket.connect"})
+        self.assertEqual((await socket.receive_output(1))["type"], "websocket.accept")
+
+        with self.settings(AUCTION_BID_RATE=0.001, AUCTION_BID_BURST=2):
+            frame = await self._result(socket, [1])
+            self.assertEqual(frame["event"], "error")
+
+            bid = {"action": "bid", "team": "MI", "amount": 200, "key": "k1"}
+            self.assertEqual((await self._result(socket, bid))["status"], 200)
+            replay = await self._result(socket, bid)
+            self.assertEqual(replay["status"], 200)
+            self.assertTrue(replay["replayed"])
+
+            await self._result(socket, {"action": "bid", "team": "MI", "amount": 220})
+            limited = await self._result(socket, {"action": "bid", "team": "MI", "amount": 240})
+            self.assertEqual(limited["status"], 429)
+
+        await socket.send_input({"type": "websocket.disconnect", "code": 1000})
+        await socket.wait(1)
+
+    async def test_unknown_room_is_rejected(self):
+        """Test sockets for rooms that don't exist are closed"""
+        socket = self._connect("NOPE")
+        await socket.send_input({"type": "websocket.connect"})
+        self.assertEqual((await socket.receive_output(1))["type"], "websocket.close")
+
+
+class IdleClientTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        Player.objects.create(name="Player A", role="BAT", base_price=200, country="India", set_no=1)
+        self.client = APIClient()
+        res = self.client.post('/api/create-room/', {"host_name": "HostUser", "team": "CSK"}, format='json')
+        self.room_code = res.data['code']
+        self.client.post('/api/join-room/', {"code": self.room_code, "username": "Joiner", "team": "MI"}, format='json')
+
+    def test_room_state_long_poll(self):
+        """Test long-poll returns at once when behind and waits out the timeout when current"""
+        self.client.post('/api/start-auction/', {"code": self.room_code}, format='json')
+        self.client.post('/api/pause-auction/', {"code": self.room_code}, format='json')
+        room = Room.objects.get(code=self.room_code)
+
+        res = self.client.get(f'/api/room-state/{self.room_code}/', {"since": room.version - 1, "wait": 5})
+        self.assertEqual(res.data['version'], room.version)
+
+        started = time.monotonic()
+        res = self.client.get(f'/api/room-state/{self.room_code}/', {"since": room.version, "wait": 0.2})
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(res.status_code, 200)
+
+    async def test_long_poll_wakes_on_room_event(self):
+        """Test a waiting long-poll is woken by the room's events, not its re-check timer"""
+        room = await Room.objects.aget(code=self.room_code)
+        url = f'/api/room-state/{self.room_code}/'
+        poll = asyncio.ensure_future(self.async_client.get(url, {"since": room.version, "wait": 5}))
+        await asyncio.sleep(0.1)
+        self.assertFalse(poll.done())
+
+        started = time.monotonic()
+        await Room.objects.filter(code=self.room_code).aupdate(version=F("version") + 1)
+        room_cache.set_version(self.room_code, room.version + 1)
+        room_events.publish_event(self.room_code, "state", {"version": room.version + 1})
+        res = await poll
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['version'], room.version + 1)
+
+    def _poll(self, query):
+        return ApplicationCommunicator(application, {
+            "type": "http",
+            "method": "GET",
+            "path": f"/api/room-state/{self.room_code}/",
+            "query_string": query.encode(),
+            "headers": [],
+        })
+
+    async def test_waiting_long_polls_hold_no_threads(self):
+        """Test long-polls waiting behind the ASGI app don't each take a thread"""
+        room = await Room.objects.aget(code=self.room_code)
+        room_cache.set_version(self.room_code, room.version)
+        threads = threading.active_count()
+
+        with mock.patch.object(views, "snapshot_needs_version_check", return_value=False):
+            polls = [self._poll(f"since={room.version}&wait=0.5") for _ in range(20)]
+            for poll in polls:
+                await poll.send_input({"type": "http.request", "body": b""})
+            await asyncio.sleep(0.2)
+            self.assertLessEqual(threading.active_count(), threads)
+
+            for poll in polls:
+                start = await poll.receive_output(2)
+                self.assertEqual(start["status"], 200)
+
+    async def test_event_stream_resumes_from_last_event_id(self):
+        """Test SSE reconnects replay only events after Last-Event-ID"""
+        first = room_events.publish_event(self.room_code, "chat", {"message": "one"})
+        room_events.publish_event(self.room_code, "chat", {"message": "two"})
+
+        res = await self.async_client.get(f'/api/events/{self.room_code}/', headers={"Last-Event-ID": first["id"]})
+        self.assertEqual(res['Content-Type'], "text/event-stream")
+        stream = aiter(res.streaming_content)
+        await anext(stream)  # retry hint
+        frame = (await anext(stream))
+        frame = frame.decode() if isinstance(frame, bytes) else frame
+        await stream.aclose()
+
+        self.assertIn("event: chat", frame)
+        self.assertIn('"two"', frame)
+
+    async def test_open_event_streams_hold_no_db_connections(self):
+        """Test an SSE stream's connection is closed before it starts streaming"""
+        opened = []
+        def record(connection, **kwargs):
+            opened.append(connection)
+        connection_created.connect(record)
+        self.addCleanup(connection_created.disconnect, record)
+
+        streams = []
+        for _ in range(5):
+            stream = ApplicationCommunicator(application, {
+                "type": "http",
+                "method": "GET",
+                "path": f"/api/events/{self.room_code}/",
+                "query_string": b"",
+                "headers": [],
+            })
+            await stream.send_input({"type": "http.request", "body": b""})
+            self.assertEqual((await stream.receive_output(2))["status"], 200)
+            streams.append(stream)
+
+        # Only the shared pool's threads query (and, outside the in-memory
+        # test database, close again) - not one connection per stream
+        self.assertLess(len(opened), len(streams))
+        for stream in streams:
+            await stream.send_input({"type": "http.disconnect"})
+            await stream.wait(1)
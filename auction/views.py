@@ -2,17 +2,41 @@ from rest_framework import viewsets
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 from datetime import timedelta
-from decimal import Decimal
+import math
 import random
 import string
 
-from .models import Player, Team, Auction, Room, Participant, ChatMessage, AuctionLog
+from .models import Player, Team, Auction, Room, Participant, ChatMessage, AuctionLog, ProxyBid, lakhs_to_crores
 from .serializers import PlayerSerializer, TeamSerializer, AuctionSerializer
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from django.http import JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+import logging
+import time
+from asgiref.sync import sync_to_async
 
 
 from .services.team_evaluator import evaluate_team
+from .services.room_events import stream_events, subscribe
+from .services.broadcast import get_broadcast, publish
+from .services.db_thread import run_db
+from .services.room_ops import (
+    save_room, save_room_if_unchanged, lock_room, add_log, record_sale, move_to_next_player,
+    remaining_seconds, restart_timer, seconds_left, bid_increment as next_bid_increment,
+    next_bid, is_overseas, default_lineup, set_lineup, lineup_ids, squad_counts,
+    settle_qualification, SQUAD_COUNT_FIELDS, QUALIFYING_SQUAD_SIZE
+)
+from .services.proxy_bidding import resolve_proxies
+from .services.auction_clock import finalize_result
+from .services.request_guard import guard_request
+from .services import bid_ledger, metrics, room_cache
+
+logger = logging.getLogger(__name__)
 
 class PlayerViewSet(viewsets.ModelViewSet):
     queryset = Player.objects.all().order_by("set_no")
@@ -51,6 +75,7 @@ def create_room(request):
         team=team,
         is_host=True
     )
+    room_cache.invalidate_lobby()
 
     return Response({"code": room.code})
 
@@ -65,91 +90,96 @@ def join_room(request):
     if not all([code, username, team]):
         return Response({"error": "Missing data"}, status=400)
 
-    try:
-        room = Room.objects.get(code=code)
-    except Room.DoesNotExist:
-        return Response({"error": "Invalid room"}, status=404)
+    with transaction.atomic():
+        room = lock_room(code)
+        if room is None:
+            return Response({"error": "Invalid room"}, status=404)
 
-    if Participant.objects.filter(room=room, team=team).exists():
-        return Response({"error": "Team already taken"}, status=409)
+        if Participant.objects.filter(room=room, team=team).exists():
+            return Response({"error": "Team already taken"}, status=409)
 
-    Participant.objects.create(
-        room=room,
-        username=username,
-        team=team,
-        is_host=False
+        Participant.objects.create(
+            room=room,
+            username=username,
+            team=team,
+            is_host=False
+        )
+        room.squad_version += 1  # A new (empty) squad for the summary
+        save_room(room)  # players_joined changed
+    room_cache.invalidate_lobby()
+
+    return Response({"message": "Joined successfully"})
+
+
+LOBBY_STATUSES = {"LIVE": True, "WAITING": False}
+LOBBY_MAX_PAGE_SIZE = 200
+
+
+def lobby_rooms(status=None, cursor=0):
+    """Today's public rooms, newest first, with host team and player count (one query)"""
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    rooms = Room.objects.filter(
+        is_public=True, created_at__gte=today, created_at__lt=today + timedelta(days=1)
+    ).exclude(status='COMPLETED')
+    if status:
+        rooms = rooms.filter(is_live=LOBBY_STATUSES[status])
+    if cursor:
+        rooms = rooms.filter(id__lt=cursor)
+
+    host_team = Participant.objects.filter(room=OuterRef("pk"), is_host=True).values("team")[:1]
+    return (
+        rooms.annotate(player_count=Count("participants"), host_team=Subquery(host_team))
+        .order_by("-id")
+        .values("id", "code", "host_name", "host_team", "player_count", "is_live")
     )
 
 
-    return Response({"message": "Joined successfully"})
+def build_lobby_page(status, cursor, limit):
+    """One page of lobby_rooms() plus the cursor for the next one"""
+    rows = list(lobby_rooms(status, cursor)[:limit + 1])
+
+    result = [
+        {
+            "code": row["code"],
+            "host": row["host_name"],
+            "host_team": row["host_team"] or "Unknown",
+            "player_count": row["player_count"],
+            "status": "LIVE" if row["is_live"] else "WAITING",
+            "is_live": row["is_live"]
+        }
+        for row in rows[:limit]
+    ]
+    return {
+        "rooms": result,
+        "next_cursor": rows[limit - 1]["id"] if len(rows) > limit else None,
+    }
 
 
 @csrf_exempt
 @api_view(["GET"])
 def get_active_rooms(request):
-    """Get list of public active rooms"""
-    # Fix: Correct logical filtering
-    # We want rooms that are NOT COMPLETED
-    today = timezone.now().date()
-    # We want rooms that are NOT COMPLETED and created TODAY
-    rooms = Room.objects.filter(is_public=True, created_at__date=today).exclude(status='COMPLETED').order_by('-created_at')
-    
-    result = []
-    for room in rooms:
-        host_team = "Unknown"
-        # Try to find host's team
-        host = Participant.objects.filter(room=room, is_host=True).first()
-        if host:
-            host_team = host.team
-            
-        result.append({
-            "code": room.code,
-            "host": room.host_name,
-            "host_team": host_team,
-            "player_count": room.participants.count(),
-            "status": "LIVE" if room.is_live else "WAITING",
-            "is_live": room.is_live
-        })
-        
-    return Response(result)
-
+    """
+    Get list of public active rooms (created today, not completed), a page
+    at a time: ?status=LIVE|WAITING, ?limit=<n>, ?cursor=<next_cursor>.
+    """
+    status = request.GET.get("status", "").upper() or None
+    if status and status not in LOBBY_STATUSES:
+        return Response({"error": "Invalid status"}, status=400)
+    try:
+        cursor = int(request.GET.get("cursor") or 0)
+        limit = int(request.GET.get("limit", settings.AUCTION_LOBBY_PAGE_SIZE))
+    except ValueError:
+        return Response({"error": "Invalid cursor/limit value"}, status=400)
+    limit = min(max(limit, 1), LOBBY_MAX_PAGE_SIZE)
 
-# ---------------- AUCTION CONTROL ---------------- #
+    page = room_cache.get_lobby_page(status, cursor, limit)
+    if page is None:
+        page = build_lobby_page(status, cursor, limit)
+        room_cache.set_lobby_page(status, cursor, limit, page)
+    return Response(page)
 
-def move_to_next_player(room):
-    """Helper function to move auction to next player"""
-    if not room.current_player:
-        return False
-        
-    current_set = room.current_player.set_no
-    current_id = room.current_player.id
-    
-    # 1. Try to find next player in the SAME set (same set_no, higher ID)
-    next_player = Player.objects.filter(
-        set_no=current_set, 
-        id__gt=current_id
-    ).order_by('id').first()
-    
-    # 2. If no more in same set, find first player in NEXT set (higher set_no)
-    if not next_player:
-        next_player = Player.objects.filter(
-            set_no__gt=current_set
-        ).order_by('set_no', 'id').first()
-    
-    if next_player:
-        room.current_player = next_player
-        room.current_bid = next_player.base_price
-        room.highest_bidder = None
-        room.timer = room.default_timer_duration
-        room.last_timer_update = timezone.now()
-        room.save()
-        return True
-    else:
-        # No more players - end auction
-        room.is_live = False
-        room.save()
-        return False
 
+# ---------------- AUCTION CONTROL ---------------- #
 
 @csrf_exempt
 @api_view(["POST"])
@@ -159,27 +189,39 @@ def start_auction(request):
     if not code:
         return Response({"error": "Room code required"}, status=400)
 
-    try:
-        room = Room.objects.get(code=code)
-    except Room.DoesNotExist:
-        return Response({"error": "Invalid room"}, status=404)
-
-    # Set first player if not set
-    if not room.current_player:
-        first_player = Player.objects.order_by("set_no").first()
-        if not first_player:
-            return Response({"error": "No players found in database"}, status=404)
-        room.current_player = first_player
-        room.current_bid = first_player.base_price
-
-    # Set room to live
-    room.is_live = True
-    room.is_paused = False
-    room.timer = room.default_timer_duration  # ✅ Use dynamic timer
-    room.last_timer_update = timezone.now()
-    room.save()
+    with transaction.atomic():
+        room = lock_room(code)
+        if room is None:
+            return Response({"error": "Invalid room"}, status=404)
 
-    AuctionLog.objects.create(room=room, message="🎬 Auction Started!")
+        # Set first player if not set - and fix the order players come up in
+        if not room.current_player:
+            lineup = request.data.get("lineup")  # Optional custom order of player ids
+            if lineup is None:
+                lineup = default_lineup()
+            else:
+                try:
+                    lineup = [int(player_id) for player_id in lineup]
+                except (ValueError, TypeError):
+                    return Response({"error": "Invalid lineup"}, status=400)
+                if len(set(lineup)) != len(lineup) or Player.objects.filter(id__in=lineup).count() != len(lineup):
+                    return Response({"error": "Invalid lineup"}, status=400)
+            if not lineup:
+                return Response({"error": "No players found in database"}, status=404)
+            first_player = Player.objects.get(id=lineup[0])
+            set_lineup(room, lineup)
+            room.current_player = first_player
+            room.current_bid = first_player.base_price
+
+        # Set room to live
+        room.is_live = True
+        room.is_paused = False
+        restart_timer(room)  # ✅ Use dynamic timer
+        save_room(room)
+
+        add_log(room, "🎬 Auction Started!")
+    room_cache.invalidate_lobby()
+    resolve_proxies(room)
 
     return Response({
         "message": "Auction started",
@@ -196,31 +238,40 @@ def pause_auction(request):
     if not code:
         return Response({"error": "Room code required"}, status=400)
     
-    try:
-        room = Room.objects.get(code=code)
-    except Room.DoesNotExist:
-        return Response({"error": "Invalid room"}, status=404)
-    
-    # Toggle pause state
-    room.is_paused = not room.is_paused
-    
-    if room.is_paused:
-        # Calculate remaining time and freeze it
-        if room.last_timer_update:
-            elapsed = (timezone.now() - room.last_timer_update).total_seconds()
-            room.timer = max(0, room.timer - int(elapsed))
-    else:
-        # Resume - reset last update time
-        room.last_timer_update = timezone.now()
-    
-    room.save()
-    
-    log_msg = "⏸️ Auction Paused" if room.is_paused else "▶️ Auction Resumed"
-    AuctionLog.objects.create(room=room, message=log_msg)
+    with transaction.atomic():
+        room = lock_room(code)
+        if room is None:
+            return Response({"error": "Invalid room"}, status=404)
+
+        # Toggle pause state
+        room.is_paused = not room.is_paused
+
+        if room.is_paused:
+            # Freeze the remaining time
+            room.paused_remaining = remaining_seconds(room)
+            room.deadline_at = None
+        else:
+            # Resume - the remaining time becomes a new deadline
+            remaining = room.paused_remaining
+            if remaining is None:
+                remaining = room.default_timer_duration
+            room.deadline_at = timezone.now() + timedelta(seconds=remaining)
+            room.paused_remaining = None
+
+        save_room(room)
+        timer = math.ceil(remaining_seconds(room))
+
+        publish(room.code, "pause", {"is_paused": room.is_paused, "timer": timer, "deadline_at": room.deadline_at})
+        log_msg = "⏸️ Auction Paused" if room.is_paused else "▶️ Auction Resumed"
+        add_log(room, log_msg)
+    if not room.is_paused:
+        resolve_proxies(room)  # Proxies registered during the pause
     
     return Response({
         "is_paused": room.is_paused,
-        "timer": room.timer
+        "timer": timer,
+        "deadline_at": room.deadline_at,
+        "server_time": timezone.now()
     })
 
 
@@ -235,152 +286,275 @@ def update_room_settings(request):
         return Response({"error": "Missing data"}, status=400)
         
     try:
-        room = Room.objects.get(code=code)
-    except Room.DoesNotExist:
-        return Response({"error": "Invalid room"}, status=404)
-        
-    try:
-        room.default_timer_duration = int(timer_duration)
-        room.save()
-        return Response({"message": "Settings updated", "timer": room.default_timer_duration})
+        timer_duration = int(timer_duration)
     except ValueError:
         return Response({"error": "Invalid timer value"}, status=400)
 
+    with transaction.atomic():
+        room = lock_room(code)
+        if room is None:
+            return Response({"error": "Invalid room"}, status=404)
+        room.default_timer_duration = timer_duration
+        save_room(room)
+    return Response({"message": "Settings updated", "timer": room.default_timer_duration})
+
 
 @csrf_exempt
 @api_view(["POST"])
+@guard_request("place_bid", lambda data: (data.get("code"), data.get("team"), data.get("amount")))
 def place_bid(request):
-    code = request.data.get("code")
-    team = request.data.get("team")
-    amount = request.data.get("amount")
+    payload, status = submit_bid(
+        request.data.get("code"),
+        request.data.get("team"),
+        request.data.get("amount")
+    )
+    return Response(payload, status=status)
 
-    print(f"\n{'='*60}")
-    print(f"PLACE BID REQUEST")
-    print(f"{'='*60}")
-    print(f"Team: {team}")
-    print(f"Amount: {amount}")
-    print(f"{'='*60}\n")
 
-    if not all([code, team, amount]):
-        return Response({"error": "Missing data"}, status=400)
+@csrf_exempt
+@api_view(["POST"])
+@guard_request("bid_next", lambda data: None)  # A repeat may be a real re-bid - Idempotency-Key only
+def bid_next(request):
+    """Bid the next step of the ladder - the server works out the amount"""
+    payload, status = submit_bid(request.data.get("code"), request.data.get("team"))
+    return Response(payload, status=status)
+
+
+@csrf_exempt
+@api_view(["POST"])
+def set_proxy_bid(request):
+    """
+    Register a hidden maximum for the current player (or an upcoming one via
+    player_id); the server bids for the team up to it. max_amount 0 clears it.
+    """
+    code = request.data.get("code")
+    team = request.data.get("team")
+    try:
+        max_amount = int(request.data.get("max_amount"))
+        player_id = request.data.get("player_id")
+        player_id = int(player_id) if player_id not in (None, "") else None
+    except (ValueError, TypeError):
+        return Response({"error": "Invalid max_amount/player_id"}, status=400)
 
     try:
         room = Room.objects.get(code=code)
+        participant = Participant.objects.get(room=room, team=team)
     except Room.DoesNotExist:
         return Response({"error": "Invalid room code"}, status=404)
-    
-    print(f"Current Room State:")
-    print(f"  Current Bid: {room.current_bid}")
-    print(f"  Highest Bidder: {room.highest_bidder}")
-    print(f"  Player: {room.current_player.name if room.current_player else 'None'}")
-    
-    # Check if paused
-    if room.is_paused:
-        return Response({"error": "Auction is paused"}, status=403)
+    except Participant.DoesNotExist:
+        return Response({"error": "Team not found in room"}, status=403)
+
+    player_id = player_id or room.current_player_id
+    player = Player.objects.filter(id=player_id).first()
+    if player is None:
+        return Response({"error": "Player not found"}, status=404)
+    if Auction.objects.filter(room=room, player=player, is_finalized=True).exists():
+        return Response({"error": "Player already auctioned"}, status=400)
+
+    if max_amount <= 0:
+        ProxyBid.objects.filter(room=room, player=player, team=team).delete()
+        return Response({"message": "Proxy bid cleared", "player_id": player.id})
+    if max_amount < player.base_price:
+        return Response({"error": "Max bid is below the base price"}, status=400)
+    if max_amount > participant.purse:
+        return Response({"error": "Insufficient budget"}, status=403)
+
+    ProxyBid.objects.update_or_create(
+        room=room, player=player, team=team, defaults={"max_amount": max_amount}
+    )
+    proxy_bids = resolve_proxies(room) if player.id == room.current_player_id else []
+    return Response({
+        "message": "Proxy bid set",
+        "player_id": player.id,
+        "max_amount": max_amount,
+        "proxy_bids": len(proxy_bids)
+    })
+
+
+BID_FIELDS = ["current_bid", "highest_bidder", "deadline_at", "paused_remaining"]
+BID_SAVE_ATTEMPTS = 5  # Conflicts that weren't an outbid (e.g. a join) are retried
+
+
+def outbid_response(room):
+    """409 telling the bidder what to bid now"""
+    retry_with = next_bid(room)
+    return {
+        "error": f"Outbid, retry with {retry_with}",
+        "current_bid": room.current_bid,
+        "highest_bidder": room.highest_bidder,
+        "retry_with": retry_with,
+    }, 409
+
+
+def submit_bid(code, team, amount=None):
+    """
+    Validate and apply a bid - shared by the HTTP endpoints and the WebSocket.
+    Returns (payload, http_status).
+
+    The server owns the bid ladder: `amount` must be exactly the room's
+    next_bid() (a stale amount gets 409 with the one to send), and leaving it
+    out bids whatever the next step is.
+
+    The bid is written with a compare-and-swap on the room version, so two
+    teams bidding at once can't overwrite each other: the loser re-reads the
+    room and is told it was outbid (never silently moved up a step).
+    """
+    stages = metrics.StageTimer("bid", settings.AUCTION_BID_TIMINGS)
+
+    if not all([code, team]):
+        return {"error": "Missing data"}, 400
+
+    if amount is not None:
+        try:
+            amount = int(amount)
+        except (ValueError, TypeError):
+            return {"error": "Invalid bid amount"}, 400
 
-    # Fetch participant
     try:
+        room = Room.objects.select_related("current_player").get(code=code)
         participant = Participant.objects.get(room=room, team=team)
+    except Room.DoesNotExist:
+        return {"error": "Invalid room code"}, 404
     except Participant.DoesNotExist:
-        return Response({"error": "Team not found in room"}, status=403)
+        return {"error": "Team not found in room"}, 403
+    stages.mark("lookup")
 
     # ❌ Squad Size Check (Max 25)
     if participant.squad_count >= 25:
-        print(f"  ❌ Squad Limit Exceeded for {team}: {participant.squad_count}/25")
-        return Response({"error": "Squad Limit (25) Reached!"}, status=403)
+        logger.debug("Bid rejected: squad limit", extra={"room": code, "team": team, "squad_count": participant.squad_count})
+        return {"error": "Squad Limit (25) Reached!"}, 403
         
-    # ❌ Same team cannot overbid itself
-    if room.highest_bidder == team:
-        print(f"  ❌ {team} already has highest bid!")
-        return Response({" error": "You already have highest bid"}, status=403)
-    
-    # ❌ OS LIMIT CHECK checks
-    if room.current_player and room.current_player.country.lower() != "india":
-        # Check if team already has 8 OS players
-        # Note: We rely on the finalized auction data for this count
-        try:
-            team_obj = Team.objects.get(name=team)
-            os_count = Auction.objects.filter(
-                room=room,
-                team=team_obj,
-                is_finalized=True
-            ).exclude(player__country__iexact='India').count()
-            
-            if os_count >= 8:
-                print(f"  ❌ OS Limit Exceeded for {team}: {os_count}/8")
-                return Response({"error": "Overseas Player Limit (8) Reached!"}, status=403)
-        except Team.DoesNotExist:
-            pass # Should not happen if participant exists
-
-    # ❌ Budget check
-    try:
-        amount = int(amount)
-    except (ValueError, TypeError):
-        return Response({"error": "Invalid bid amount"}, status=400)
-    
-    # Convert budget from Crores to Lakhs (1 Cr = 100 Lakhs)
-    budget_in_lakhs = participant.budget * 100
-    
-    print(f"  Team Budget: ₹{participant.budget} Cr (₹{budget_in_lakhs}L)")
-    print(f"  Bid Amount: ₹{amount}L")
-    
-    if budget_in_lakhs < amount:
-        print(f"  ❌ Insufficient budget!")
-        return Response({"error": "Insufficient budget"}, status=403)
-    
-    # ✅ ONLY Update room state - DO NOT create Auction record yet!
-    # Auction record is created only when player is SOLD (finalized)
-    room.current_bid = amount
-    room.highest_bidder = team
-    room.timer = room.default_timer_duration  # ✅ Use dynamic timer
-    room.last_timer_update = timezone.now()
-    room.save()
-    
-    print(f"  ✅ Bid accepted! New bid: ₹{amount}L by {team}")
+    # ❌ OS LIMIT CHECK (Max 8) - counter kept by record_sale
+    if room.current_player and is_overseas(room.current_player) and participant.overseas_count >= 8:
+        logger.debug("Bid rejected: overseas limit", extra={"room": code, "team": team, "os_count": participant.overseas_count})
+        return {"error": "Overseas Player Limit (8) Reached!"}, 403
+
+    budget_in_lakhs = participant.purse
+
+    player_id = room.current_player_id
+    leader = room.highest_bidder  # Who the team saw leading when it bid
+    for _ in range(BID_SAVE_ATTEMPTS):
+        if not room.is_live or room.status != 'LIVE':
+            return {"error": "Auction is not live"}, 409
+        if not player_id or room.current_player_id != player_id or room.sold_status:
+            return {"error": "Bidding has closed for this player"}, 409
+        if room.is_paused:
+            return {"error": "Auction is paused"}, 403
+        if remaining_seconds(room) <= 0:
+            return {"error": "Bidding has closed for this player"}, 409  # Waiting for the clock to settle it
+        # ❌ Same team cannot overbid itself
+        if room.highest_bidder == team:
+            return {"error": "You already have highest bid"}, 403
+
+        # ❌ Stale or off-ladder amount (without one: a rival got in first)
+        bid = next_bid(room)
+        if amount is None and room.highest_bidder != leader:
+            return outbid_response(room)
+        if amount is not None and amount != bid:
+            logger.debug("Bid rejected: stale amount", extra={"room": code, "team": team, "amount": amount, "next_bid": bid})
+            return outbid_response(room)
+
+        # ❌ Budget check
+        if budget_in_lakhs < bid:
+            logger.debug("Bid rejected: budget", extra={"room": code, "team": team, "amount": bid, "budget": budget_in_lakhs})
+            return {"error": "Insufficient budget"}, 403
+        stages.mark("validation")
+
+        # ✅ ONLY Update room state - DO NOT create Auction record yet!
+        # Auction record is created only when player is SOLD (finalized)
+        room.current_bid = bid
+        room.highest_bidder = team
+        restart_timer(room)  # ✅ Use dynamic timer
+        saved = save_room_if_unchanged(room, BID_FIELDS)
+        stages.mark("save")
+        if saved:
+            break
+        room = Room.objects.select_related("current_player").get(pk=room.pk)  # Lost the race
+    else:
+        return outbid_response(room)
+
+    bid_ledger.record_bid(room, team, bid)
+    publish(room.code, "bid", {
+        "team": team,
+        "amount": bid,
+        "timer": room.default_timer_duration,
+        "deadline_at": room.deadline_at,
+        "version": room.version
+    })
 
     # Log Bid
-    bid_text = f"₹{str(amount / 100)} Cr" if amount >= 100 else f"₹{amount}L"
-    AuctionLog.objects.create(room=room, message=f"🏏 {team} bid {bid_text}")
-    print(f"{'='*60}\n")
-
-    return Response({"message": "Bid accepted", "new_timer": room.default_timer_duration})
+    bid_text = f"₹{str(bid / 100)} Cr" if bid >= 100 else f"₹{bid}L"
+    add_log(room, f"🏏 {team} bid {bid_text}")
+    stages.mark("log_insert")
+    proxy_bids = resolve_proxies(room)  # Registered maximums answer straight away
+    stages.finish()
+    logger.debug("Bid accepted", extra={"room": code, "team": team, "amount": bid, "version": room.version})
+
+    return {
+        "message": "Bid accepted",
+        "amount": bid,
+        "proxy_bids": len(proxy_bids),
+        "new_timer": room.default_timer_duration,
+        "deadline_at": room.deadline_at,
+        "server_time": timezone.now()
+    }, 200
+
+
+def lot_fingerprint(data):
+    """
+    Host actions on a lot (sell/skip) only repeat each other when they name
+    the same lot with player_id - without it, Idempotency-Key only, since the
+    same request a moment later is meant for the next lot.
+    """
+    if data.get("player_id") in (None, ""):
+        return None
+    return data.get("code"), data.get("player_id")
+
+
+def named_lot(data):
+    """The player_id a sell/skip names (None: whoever is up); ValueError if malformed"""
+    player_id = data.get("player_id")
+    return int(player_id) if player_id not in (None, "") else None
 
 
 @csrf_exempt
 @api_view(["POST"])
+@guard_request("sell_player", lot_fingerprint)
 def sell_player(request):
-    """Finalize current player sale and move to next"""
+    """Finalize current player sale and move to next (optional player_id: only if still up)"""
     code = request.data.get("code")
     
     if not code:
         return Response({"error": "Room code required"}, status=400)
-    
     try:
-        room = Room.objects.get(code=code)
-    except Room.DoesNotExist:
-        return Response({"error": "Invalid room"}, status=404)
-    
-    # Update participant budget and squad if sold
-    if room.highest_bidder:
-        participant = Participant.objects.get(room=room, team=room.highest_bidder)
-        team_obj, _ = Team.objects.get_or_create(name=room.highest_bidder)
-        
-        # ✅ CREATE FINALIZED Auction record
-        Auction.objects.create(
-            room=room,
-            player=room.current_player,
-            team=team_obj,
-            price=room.current_bid,
-            is_finalized=True
-        )
-        
-        # ✅ FIX: Deduct budget correctly (1 Cr = 100 Lakhs, not 10000)
-        participant.budget -= Decimal(str(room.current_bid)) / Decimal('100')
-        participant.squad_count += 1
-        participant.save()
-    
-    # Move to next player
-    has_next = move_to_next_player(room)
+        player_id = named_lot(request.data)
+    except (ValueError, TypeError):
+        return Response({"error": "Invalid player_id"}, status=400)
+    
+    # Sale, squad_version and the move commit together (and can't race the clock)
+    with transaction.atomic():
+        room = lock_room(code)
+        if room is None:
+            return Response({"error": "Invalid room"}, status=404)
+        if player_id is not None and room.current_player_id != player_id:
+            return Response({"error": "Player is no longer up"}, status=409)
+
+        if room.sold_status:
+            # The clock already marked this lot - settle that result, don't sell it again
+            has_next = finalize_result(room)
+        else:
+            # Update participant budget and squad if sold (and the purse still covers it)
+            if room.highest_bidder and record_sale(room, room.highest_bidder, room.current_bid):
+                publish(room.code, "sold", {
+                    "player": room.current_player.name,
+                    "team": room.highest_bidder,
+                    "price": room.current_bid
+                })
+
+            # Move to next player
+            has_next = move_to_next_player(room)
+    if has_next:
+        resolve_proxies(room)
     
     if has_next:
         return Response({"message": "Player sold, moved to next"})
@@ -390,92 +564,64 @@ def sell_player(request):
 
 # ---------------- STATE SYNC ---------------- #
 
-@csrf_exempt
-@api_view(["GET"])
-def get_room_state(request, code):
-    """Get complete synchronized room state"""
-    try:
-        room = Room.objects.get(code=code)
-    except Room.DoesNotExist:
-        return Response({"error": "Invalid room code"}, status=404)
+def room_state_etag(code, version):
+    """
+    ETag for the room-state payload. The countdown is not part of it:
+    clients tick locally from deadline_at/server_time, so a running lot
+    stays 304 until something actually changes.
+    """
+    return quote_etag(f"{code}-{version}")
 
-    # Calculate current timer value
-    if room.is_live and not room.is_paused and room.last_timer_update:
-        elapsed = (timezone.now() - room.last_timer_update).total_seconds()
-        current_timer = max(0, room.timer - int(elapsed))
-        
-        # ✅ NEW LOGIC: Handle sold/unsold status with 2-second delay
-        if current_timer == 0 and not room.sold_status:
-            # Timer just hit 0 - mark as SOLD or UNSOLD (don't move to next player yet!)
-            if room.highest_bidder:
-                room.sold_status = 'SOLD'
-                room.sold_team = room.highest_bidder
-                room.sold_price = room.current_bid
-            else:
-                room.sold_status = 'UNSOLD'
-                room.sold_team = None
-                room.sold_price = None
-            
-            room.sold_at = timezone.now()
-            room.save()
-        
-        elif room.sold_status and room.sold_at:
-            # Check if 1 second has elapsed since sold/unsold/skipped was set
-            time_since_sold = (timezone.now() - room.sold_at).total_seconds()
-            
-            if time_since_sold >= 1:  # ✅ Changed from 2 seconds to 1 second
-                # 1 second has passed - now finalize and move to next player
-                if room.sold_status == 'SOLD':
-                    # Get participant and team objects
-                    participant = Participant.objects.get(room=room, team=room.sold_team)
-                    team_obj, _ = Team.objects.get_or_create(name=room.sold_team)
-                    
-                    # ✅ CREATE FINALIZED Auction record (player is SOLD!)
-                    Auction.objects.create(
-                        room=room,
-                        player=room.current_player,
-                        team=team_obj,
-                        price=room.sold_price,
-                        is_finalized=True
-                    )
-                    
-                    # ✅ FIX: Update participant budget correctly (1 Cr = 100 Lakhs, not 10000)
-                    participant.budget -= Decimal(str(room.sold_price)) / Decimal('100')
-                    participant.squad_count += 1
-                    participant.save()
-                    
-                else:
-                    # ✅ CREATE FINALIZED Auction record for UNSOLD/SKIPPED
-                    Auction.objects.create(
-                        room=room,
-                        player=room.current_player,
-                        team=None,
-                        price=None,
-                        is_finalized=True,
-                        status=room.sold_status
-                    )
-
-                    # Log the Result
-                    if room.sold_status == 'UNSOLD':
-                         AuctionLog.objects.create(room=room, message=f"❌ {room.current_player.name} went UNSOLD")
-                    elif room.sold_status == 'SKIPPED':
-                         AuctionLog.objects.create(room=room, message=f"⏭️ {room.current_player.name} SKIPPED")
-                
-                if room.sold_status == 'SOLD':
-                     price_fmt = f"₹{room.sold_price/100} Cr" if room.sold_price >= 100 else f"₹{room.sold_price}L"
-                     AuctionLog.objects.create(room=room, message=f"🏆 {room.current_player.name} SOLD to {room.sold_team} for {price_fmt}!")
-                # Clear sold status and move to next player
-                room.sold_status = None
-                room.sold_at = None
-                room.sold_team = None
-                room.sold_price = None
-                room.save()
-                
-                # Move to next player (whether sold, unsold, or skipped)
-                move_to_next_player(room)
-                current_timer = room.timer
-    else:
-        current_timer = room.timer
+
+LONG_POLL_MAX_WAIT = 30  # seconds
+
+
+def room_exists(code):
+    return Room.objects.filter(code=code).exists()
+
+
+def current_room_version(code):
+    """The room's version from the database (None if there is no such room)"""
+    return Room.objects.filter(code=code).values_list("version", flat=True).first()
+
+
+async def wait_for_room_change(code, since, wait):
+    """
+    Hold a long-poll until the room moves past `since` (or `wait` runs out).
+    Sleeps on the room's event subscription and reads the cached version,
+    so a waiting client holds no thread or DB connection. Returns False on
+    timeout.
+    """
+    deadline = time.monotonic() + wait
+    subscription = subscribe(code)  # Before the first check, so no change slips between
+    check_db = True
+    try:
+        while True:
+            version = room_cache.get_version(code)
+            # Writes by other processes only reach a process-local cache via
+            # the database - check it first and after every quiet interval
+            if version is None or (check_db and snapshot_needs_version_check()):
+                version = await run_db(current_room_version, code)
+                if version is not None:
+                    room_cache.set_version(code, version)
+            if version is None or version > since:
+                return True  # (a missing room is answered by the view)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            check_db = not await subscription.wait(min(remaining, settings.AUCTION_LONG_POLL_RECHECK))
+    finally:
+        subscription.close()
+
+
+def build_room_snapshot(code):
+    """
+    Room-level state shared by every team, plus the {team: budget} map.
+    Returns None if the room doesn't exist.
+    """
+    room = Room.objects.select_related("current_player").filter(code=code).first()
+    if room is None:
+        return None
 
     # Get current player info with ALL details
     player_data = None
@@ -485,13 +631,7 @@ def get_room_state(request, code):
         # ✅ Calculate bid increment based on CURRENT BID (not base price!)
         # This allows increments to change dynamically as bidding progresses
         current = room.current_bid if room.current_bid > 0 else room.current_player.base_price
-        
-        if current >= 200:
-            bid_increment = 20  # ₹200L+ → +₹20L
-        elif current >= 100:
-            bid_increment = 10  # ₹100L-199L → +₹10L
-        else:
-            bid_increment = 5   # Under ₹100L → +₹5L
+        bid_increment = next_bid_increment(current)
         
         player_data = {
             "id": room.current_player.id,
@@ -503,37 +643,350 @@ def get_room_state(request, code):
             "hand": room.current_player.hand,
             "bowling": room.current_player.bowling,
         }
-    
-    # Get user's current budget (if team is in request)
-    user_budget = None
-    team_name = request.GET.get('team', None)
-    if team_name:
-        try:
-            participant = Participant.objects.get(room=room, team=team_name)
-            user_budget = participant.budget  # In Crores
-        except Participant.DoesNotExist:
-            pass
 
-    return Response({
-        "room_code": room.code,
-        "is_live": room.is_live,
-        "is_paused": room.is_paused,
+    budgets = {
+        team: lakhs_to_crores(purse)
+        for team, purse in Participant.objects.filter(room=room).order_by("id").values_list("team", "purse")
+    }  # In Crores
+
+    return {
+        "state": {
+            "room_code": room.code,
+            "is_live": room.is_live,
+            "is_paused": room.is_paused,
+            "deadline_at": room.deadline_at,  # Count down locally against server_time
+            "paused_remaining": room.paused_remaining,
+            "default_timer": room.default_timer_duration,
+            "current_bid": room.current_bid,
+            "highest_bidder": room.highest_bidder,
+            "current_player": player_data,
+            "bid_increment": bid_increment,
+            "next_bid": next_bid(room) if room.current_player else None,
+            "sold_status": room.sold_status,  # 'SOLD', 'UNSOLD', or None
+            "sold_team": room.sold_team,
+            "sold_price": room.sold_price,
+            "status": room.status,  # Workflow Status (LIVE, SELECTION, COMPLETED)
+            "players_joined": len(budgets),
+            # Assuming 10 is the limit for now as per user request example "4/10"
+            # Ideally this should be a field in Room model, but fixing to 10 for demo.
+            "total_players_limit": 10,
+            "version": room.version,
+            "squad_version": room.squad_version,
+            "lineup_position": room.lineup_position if room.current_player else None,
+        },
+        "budgets": budgets,
+    }
+
+
+def snapshot_needs_version_check():
+    """
+    Whether a cached snapshot must be confirmed against the database: with a
+    process-local cache and broadcast, writes made by other processes (the
+    auction clock, other workers) never reach this process's version key.
+    """
+    return room_cache.is_process_local() and not get_broadcast().cross_process
+
+
+def load_room_snapshot(code, fresh=False):
+    """Room snapshot from the cache, rebuilt from the database on a miss"""
+    entry = None if fresh else room_cache.get_snapshot(code)
+    if entry is not None and snapshot_needs_version_check():
+        version = Room.objects.filter(code=code).values_list("version", flat=True).first()
+        if version != entry["state"]["version"]:
+            entry = None  # Changed by another process
+    if entry is None:
+        entry = build_room_snapshot(code)
+        if entry is not None:
+            room_cache.set_snapshot(code, entry)
+    return entry
+
+
+# Poll intervals (ms) suggested to clients via next_poll_ms
+POLL_IDLE_MS = 10000     # SELECTION / COMPLETED - nothing happens for a while
+POLL_PAUSED_MS = 5000    # Paused or not started yet
+POLL_BIDDING_MS = 2000   # Plenty of time left on the lot
+POLL_CLOSING_MS = 1000   # Last seconds of a lot / SOLD-UNSOLD on screen
+POLL_CLOSING_SECONDS = 5
+POLL_MAX_LOAD_FACTOR = 4
+
+
+def next_poll_ms(state, timer):
+    """How long a polling client should wait before asking again"""
+    if state["status"] != 'LIVE':
+        interval = POLL_IDLE_MS
+    elif not state["is_live"] or state["is_paused"]:
+        interval = POLL_PAUSED_MS
+    elif state["sold_status"] or timer <= POLL_CLOSING_SECONDS:
+        interval = POLL_CLOSING_MS
+    else:
+        interval = POLL_BIDDING_MS
+
+    # Back off further while this worker is slow to answer
+    latency = metrics.gauge("request_latency_ms", 0.0)
+    target = settings.AUCTION_POLL_LATENCY_TARGET_MS
+    if latency > target:
+        interval *= min(latency / target, POLL_MAX_LOAD_FACTOR)
+    return int(interval)
+
+
+def room_state_payload(entry, team_name=None):
+    """Room-state response body from a cached snapshot"""
+    state = entry["state"]
+
+    # Current timer value (read-only - the auction clock settles lots)
+    server_time = timezone.now()
+    current_timer = math.ceil(seconds_left(
+        state["is_live"], state["deadline_at"], state["paused_remaining"],
+        state["default_timer"], server_time
+    ))
+
+    # User's current budget (if team is in request)
+    user_budget = entry["budgets"].get(team_name) if team_name else None
+
+    payload = {key: value for key, value in state.items() if key != "paused_remaining"}
+    payload.update({
         "timer": current_timer,
-        "default_timer": room.default_timer_duration,
-        "current_bid": room.current_bid,
-        "highest_bidder": room.highest_bidder,
-        "current_player": player_data,
-        "bid_increment": bid_increment,
+        "server_time": server_time,
         "user_budget": user_budget,  # User's current purse in Crores
-        "sold_status": room.sold_status,  # 'SOLD', 'UNSOLD', or None
-        "sold_team": room.sold_team,
-        "sold_price": room.sold_price,
-        "status": room.status,  # Workflow Status (LIVE, SELECTION, COMPLETED)
-        "players_joined": room.participants.count(),
-        # Assuming 10 is the limit for now as per user request example "4/10"
-        # Ideally this should be a field in Room model, but fixing to 10 for demo.
-        "total_players_limit": 10, 
+        "next_poll_ms": next_poll_ms(state, current_timer),
     })
+    return payload
+
+
+def room_state_delta(base_state, entry, team_name=None):
+    """Only the fields that changed since `base_state` (derived fields always included)"""
+    payload = room_state_payload(entry, team_name)
+    changes = {
+        key: payload[key]
+        for key, value in entry["state"].items()
+        if key != "paused_remaining" and base_state.get(key) != value
+    }
+    return {
+        "delta": True,
+        "base_version": base_state["version"],
+        "version": payload["version"],
+        "changes": changes,
+        "timer": payload["timer"],
+        "server_time": payload["server_time"],
+        "user_budget": payload["user_budget"],
+        "next_poll_ms": payload["next_poll_ms"],
+    }
+
+
+@csrf_exempt
+async def get_room_state(request, code):
+    """
+    Get complete synchronized room state.
+
+    ?since=<version>&wait=25  long-poll until the room moves past `since`
+    ?since=<version>&delta=1  only the fields changed since `since` (full
+                              snapshot with "delta": false if it's too old)
+    """
+    try:
+        since = int(request.GET.get("since", -1))
+        wait = min(float(request.GET.get("wait", 0)), LONG_POLL_MAX_WAIT)
+    except ValueError:
+        wait = 0  # room_state() answers with the 400
+
+    # ✅ Long-poll (?wait=25&since=<version>) - under ASGI, long_poll.py has
+    # already waited (Django pins a thread to a request for as long as it runs)
+    changed = False
+    if wait > 0 and request.method == "GET":
+        get_broadcast()  # Make sure this process hears other workers' changes
+        changed = await wait_for_room_change(code, since, wait)
+
+    return await sync_to_async(room_state)(request, code, changed=changed)
+
+
+@api_view(["GET"])
+def room_state(request, code, changed=False):
+    """get_room_state() once any long-poll is over"""
+    try:
+        since = int(request.GET.get("since", -1))
+        float(request.GET.get("wait", 0))
+    except ValueError:
+        return Response({"error": "Invalid since/wait value"}, status=400)
+
+    entry = load_room_snapshot(code)
+    if entry is None:
+        return Response({"error": "Invalid room code"}, status=404)
+    if changed and entry["state"]["version"] <= since:
+        entry = load_room_snapshot(code, fresh=True)  # Cache hasn't caught up yet
+
+    state = entry["state"]
+
+    # ✅ Conditional GET - unchanged state is answered from the cache
+    etag = room_state_etag(code, state["version"])
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        client_etags = parse_etags(if_none_match)
+        if "*" in client_etags or etag in client_etags:
+            return Response(status=304, headers={"ETag": etag})
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    team_name = request.GET.get('team', None)
+
+    # ✅ Delta against the client's version while it is still in the ring buffer
+    want_delta = request.GET.get("delta") in ("1", "true")
+    if want_delta and since >= 0:
+        base_state = room_cache.get_history_state(code, since)
+        if base_state is not None:
+            metrics.incr("room_state.delta")
+            return Response(room_state_delta(base_state, entry, team_name), headers=headers)
+
+    payload = room_state_payload(entry, team_name)
+    if want_delta:
+        metrics.incr("room_state.delta_fallback")
+        payload["delta"] = False
+    return Response(payload, headers=headers)
+
+
+# ---------------- DASHBOARD ---------------- #
+
+DASHBOARD_CURSORS = ("state", "chat", "logs", "squads")
+
+
+def build_squads(code, budgets):
+    """Summary of every team's purchases, from one joined query"""
+    purchases = Auction.objects.filter(
+        room__code=code,
+        is_finalized=True,
+        participant__isnull=False
+    ).select_related('player', 'participant').order_by('id')
+
+    players_by_team = {team: [] for team in budgets}
+    for purchase in purchases:
+        players_by_team.setdefault(purchase.participant.team, []).append({
+            "id": purchase.player.id,
+            "name": purchase.player.name,
+            "price": purchase.price,
+            "role": purchase.player.role,
+            "country": purchase.player.country
+        })
+
+    return [
+        {
+            "team": team,
+            "budget_remaining": float(budget),
+            "players_count": len(players_by_team[team]),
+            "players": players_by_team[team]
+        }
+        for team, budget in budgets.items()
+    ]
+
+
+def _squad_version(code):
+    return Room.objects.filter(code=code).values_list("squad_version", flat=True).first()
+
+
+def load_squads(code, squad_version):
+    """Squads read model for `squad_version` - from the cache, else rebuilt"""
+    summary = room_cache.get_squads(code, squad_version)
+    if summary is None:
+        before = _squad_version(code)
+        budgets = {
+            team: lakhs_to_crores(purse)
+            for team, purse in Participant.objects.filter(room__code=code).order_by("id").values_list("team", "purse")
+        }
+        summary = build_squads(code, budgets)
+        # Only cache it if no sale landed while we were reading
+        if before == _squad_version(code) == squad_version:
+            room_cache.set_squads(code, squad_version, summary)
+    return summary
+
+
+@csrf_exempt
+@api_view(["GET"])
+def get_dashboard(request, code):
+    """
+    Room-state, chat, logs, my-team and summary in one round trip.
+
+    Pass the cursors from the previous response (?state=<version>&chat=<id>
+    &logs=<id>&squads=<squad_version>&team=MI) and only the sections that
+    changed since then are returned. With a shared cache or cross-process
+    broadcast an unchanged tick is answered from the cache; a process-local
+    one costs the snapshot's version check and the chat/log queries.
+    """
+    try:
+        cursors = {key: int(request.GET[key]) for key in DASHBOARD_CURSORS if key in request.GET}
+    except ValueError:
+        return Response({"error": "Invalid cursor"}, status=400)
+
+    entry = load_room_snapshot(code)
+    if entry is None:
+        return Response({"error": "Invalid room code"}, status=404)
+
+    state = entry["state"]
+    team_name = request.GET.get('team', None)
+    result = {"cursors": {"state": state["version"], "squads": state["squad_version"]}}
+
+    # 1. Room state
+    if cursors.get("state") != state["version"]:
+        result["state"] = room_state_payload(entry, team_name)
+
+    # 2. Chat + logs - only query when the cached head is past the client's cursor
+    # (a process-local cache never hears of rows the clock or other workers add)
+    trust_heads = not snapshot_needs_version_check()
+    heads = room_cache.get_heads(code, ("chat", "log")) if trust_heads else {}
+    streams = (
+        ("chat", "chat", ChatMessage, lambda msg: {"sender": msg.sender, "message": msg.message}),
+        ("logs", "log", AuctionLog, lambda log: {"message": log.message}),
+    )
+    for section, head_name, model, fields in streams:
+        cursor = cursors.get(section, 0)
+        result["cursors"][section] = cursor
+        head = heads.get(head_name)
+        if head is not None and head <= cursor:
+            continue
+
+        rows = model.objects.filter(room__code=code, id__gt=cursor).order_by('id')
+        items = [
+            {"id": row.id, **fields(row), "timestamp": row.timestamp.strftime("%H:%M:%S")}
+            for row in rows
+        ]
+        if items:
+            result[section] = items
+            result["cursors"][section] = items[-1]["id"]
+            room_cache.set_head(code, head_name, items[-1]["id"])
+        elif head is None and trust_heads:
+            # Remember where the stream ends (never trust the client's cursor)
+            latest = model.objects.filter(room__code=code).aggregate(latest=Max("id"))["latest"]
+            room_cache.set_head(code, head_name, latest or 0)
+
+    # 3. Squads (summary + my team) - only change when a player is sold
+    if cursors.get("squads") != state["squad_version"]:
+        summary = load_squads(code, state["squad_version"])
+        result["summary"] = summary
+        if team_name:
+            players = next((row["players"] for row in summary if row["team"] == team_name), [])
+            result["my_team"] = [
+                {"id": p["id"], "name": p["name"], "price": p["price"], "country": p["country"]}
+                for p in players
+            ]
+
+    return Response(result)
+
+
+# ---------------- EVENT STREAM ---------------- #
+
+@require_GET
+async def room_event_stream(request, code):
+    """Server-Sent Events stream of room events (served from the ASGI app)"""
+    # Not the async ORM - that would pin a DB connection to the stream for its whole life
+    if not await run_db(room_exists, code):
+        return JsonResponse({"error": "Invalid room code"}, status=404)
+    get_broadcast()  # Start listening for events from other workers
+
+    # Browsers send Last-Event-ID on reconnect; ?last_event_id= covers manual resumes
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+
+    response = StreamingHttpResponse(
+        stream_events(code, last_event_id),
+        content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Don't let proxies buffer the stream
+    return response
 
 
 # ---------------- CHAT ---------------- #
@@ -575,11 +1028,17 @@ def send_chat_message(request):
     except Room.DoesNotExist:
         return Response({"error": "Invalid room code"}, status=404)
     
-    ChatMessage.objects.create(
+    chat = ChatMessage.objects.create(
         room=room,
         sender=sender,
         message=message
     )
+    publish(room.code, "chat", {
+        "id": chat.id,
+        "sender": chat.sender,
+        "message": chat.message,
+        "timestamp": chat.timestamp.strftime("%H:%M:%S")
+    })
     
     return Response({"status": "sent"})
 
@@ -594,13 +1053,23 @@ def check_qualification(request, code):
     except Room.DoesNotExist:
         return Response({"error": "Invalid room code"}, status=404)
 
+    # Same aggregate end_auction settles with, so both always agree
+    counts = squad_counts(room)
     result = []
 
     for p in room.participants.all():
-        status = "QUALIFIED" if p.squad_count >= 18 else "DISQUALIFIED"
+        c = counts.get(p.team, dict.fromkeys(SQUAD_COUNT_FIELDS, 0))
+        status = "QUALIFIED" if c["squad_count"] >= QUALIFYING_SQUAD_SIZE else "DISQUALIFIED"
         result.append({
             "team": p.team,
-            "players": p.squad_count,
+            "players": c["squad_count"],
+            "overseas": c["overseas_count"],
+            "composition": {
+                "BATSMAN": c["batsman_count"],
+                "BOWLER": c["bowler_count"],
+                "ALL ROUNDER": c["all_rounder_count"],
+                "WICKET KEEPER": c["wicket_keeper_count"]
+            },
             "status": status
         })
 
@@ -616,15 +1085,10 @@ def get_my_team(request, code, team_name):
     except Room.DoesNotExist:
         return Response({"error": "Invalid room code"}, status=404)
     
-    try:
-        team_obj = Team.objects.get(name=team_name)
-    except Team.DoesNotExist:
-        return Response([])  # No purchases yet
-    
     # ✅ ONLY get FINALIZED auction records (sold players)
     purchases = Auction.objects.filter(
         room=room, 
-        team=team_obj, 
+        participant__team=team_name, 
         is_finalized=True  # ONLY SHOW SOLD PLAYERS!
     ).values('player__id', 'player__name', 'price', 'player__country').distinct()
     
@@ -647,27 +1111,37 @@ def get_my_team(request, code, team_name):
 
 @csrf_exempt
 @api_view(["POST"])
+@guard_request("skip_player", lot_fingerprint)
 def skip_player(request):
-    """Skip current player and move to next immediately"""
+    """Skip current player and move to next immediately (optional player_id: only if still up)"""
     code = request.data.get("code")
     
     if not code:
         return Response({"error": "Room code required"}, status=400)
-    
     try:
-        room = Room.objects.get(code=code)
-    except Room.DoesNotExist:
-        return Response({"error": "Invalid room"}, status=404)
-    
-    if not room.current_player:
-        return Response({"error": "No current player to skip"}, status=400)
+        player_id = named_lot(request.data)
+    except (ValueError, TypeError):
+        return Response({"error": "Invalid player_id"}, status=400)
     
-    # Set SKIPPED status (similar to SOLD/UNSOLD)
-    room.sold_status = 'SKIPPED'
-    room.sold_at = timezone.now()
-    room.save()
+    with transaction.atomic():
+        room = lock_room(code, "current_player")
+        if room is None:
+            return Response({"error": "Invalid room"}, status=404)
+        if player_id is not None and room.current_player_id != player_id:
+            return Response({"error": "Player is no longer up"}, status=409)
+
+        if not room.current_player:
+            return Response({"error": "No current player to skip"}, status=400)
+        if room.sold_status:
+            return Response({"error": f"Player already {room.sold_status}"}, status=409)
+
+        # Set SKIPPED status (similar to SOLD/UNSOLD)
+        room.sold_status = 'SKIPPED'
+        room.sold_at = timezone.now()
+        save_room(room)
+        publish(room.code, "skipped", {"player": room.current_player.name})
 
-    AuctionLog.objects.create(room=room, message=f"⏭️ {room.current_player.name} SKIPPED")
+        add_log(room, f"⏭️ {room.current_player.name} SKIPPED")
     
     return Response({"message": "Player skipped", "status": "SKIPPED"})
 
@@ -681,32 +1155,20 @@ def end_auction(request):
     if not code:
         return Response({"error": "Room code required"}, status=400)
     
-    try:
-        room = Room.objects.get(code=code)
-    except Room.DoesNotExist:
-        return Response({"error": "Invalid room"}, status=404)
-    
-    # End the auction and move to SELECTION phase
-    room.is_live = False
-    room.is_paused = False
-    room.status = 'SELECTION'  # Update status
-    room.save()
-    
-    # 1. QUALIFICATION CHECK
-    participants = Participant.objects.filter(room=room)
-    qualified_count = 0
-    
-    for p in participants:
-         # Count FINALIZED purchases
-         squad_size = Auction.objects.filter(room=room, team__name=p.team, is_finalized=True).count()
-         p.squad_count = squad_size # Ensure accurate count
-         
-         if squad_size >= 18:
-             p.is_qualified = True
-             qualified_count += 1
-         else:
-             p.is_qualified = False
-         p.save()
+    with transaction.atomic():
+        room = lock_room(code)
+        if room is None:
+            return Response({"error": "Invalid room"}, status=404)
+
+        # End the auction and move to SELECTION phase
+        room.is_live = False
+        room.is_paused = False
+        room.status = 'SELECTION'  # Update status
+        save_room(room)
+
+        # 1. QUALIFICATION CHECK - one GROUP BY + one bulk UPDATE for the whole room
+        participants = settle_qualification(room)
+        qualified_count = sum(p.is_qualified for p in participants)
     
     return Response({
         "message": "Auction ended. Moving to Selection Phase.",
@@ -757,8 +1219,10 @@ def submit_team(request):
     total_submitted = Participant.objects.filter(room=room, is_qualified=True, final_score__gt=0).count()
     
     if total_submitted >= total_qualified:
-        room.status = 'COMPLETED'
-        room.save()
+        with transaction.atomic():
+            room = lock_room(code)
+            room.status = 'COMPLETED'
+            save_room(room)
         return Response({"message": "Team submitted", "status": "COMPLETED"})
         
     return Response({"message": "Team submitted successfully", "status": "SELECTION"})
@@ -796,58 +1260,35 @@ def get_winner(request, code):
 @csrf_exempt
 @api_view(["GET"])
 def get_summary(request, code):
-    """Get summary of all teams and their purchased players"""
-    try:
-        room = Room.objects.get(code=code)
-    except Room.DoesNotExist:
+    """
+    Get summary of all teams and their purchased players.
+    Served from the squads read model; ETag follows squad_version, so an
+    unchanged summary is a 304.
+    """
+    entry = load_room_snapshot(code)
+    if entry is None:
         return Response({"error": "Invalid room code"}, status=404)
-    
-    # Get all participants (teams)
-    participants = Participant.objects.filter(room=room)
-    
-    result = []
-    
-    for participant in participants:
-        # Get team object
-        try:
-            team_obj = Team.objects.get(name=participant.team)
-        except Team.DoesNotExist:
-            # No purchases for this team yet
-            result.append({
-                "team": participant.team,
-                "budget_remaining": float(participant.budget),
-                "players_count": 0,
-                "players": []
-            })
-            continue
-        
-        # Get all finalized purchases for this team
-        purchases = Auction.objects.filter(
-            room=room,
-            team=team_obj,
-            is_finalized=True
-        ).select_related('player')
-        
-        players_list = []
-        for purchase in purchases:
-            players_list.append({
-                "id": purchase.player.id,
-                "name": purchase.player.name,
-                "price": purchase.price,
-                "role": purchase.player.role,
-                "country": purchase.player.country
-            })
-        
-        result.append({
-            "team": participant.team,
-            "budget_remaining": float(participant.budget),
-            "players_count": len(players_list),
-            "players": players_list
-        })
-    
-    return Response(result)
+
+    squad_version = entry["state"]["squad_version"]
+    etag = quote_etag(f"{code}-squads-{squad_version}")
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        client_etags = parse_etags(if_none_match)
+        if "*" in client_etags or etag in client_etags:
+            return Response(status=304, headers={"ETag": etag})
+
+    summary = load_squads(code, squad_version)
+    return Response(summary, headers={"ETag": etag, "Cache-Control": "no-cache"})
     
     
+# ---------------- METRICS ---------------- #
+
+@api_view(["GET"])
+def get_metrics(request):
+    """In-process counters of the worker that serves this request"""
+    return Response({"counters": metrics.counters(), "gauges": metrics.gauges()})
+
+
 # ---------------- LOGS ---------------- #
 
 @csrf_exempt
@@ -868,30 +1309,22 @@ def get_auction_logs(request, code):
     ])
 
 
-@csrf_exempt
-@api_view(["GET"])
-def get_upcoming_players(request, code):
-    """Get list of upcoming players (not yet auctioned)"""
-    try:
-        room = Room.objects.get(code=code)
-    except Room.DoesNotExist:
-        return Response({"error": "Invalid room code"}, status=404)
-    
-    current_set = room.current_player.set_no if room.current_player else -1
-    current_id = room.current_player.id if room.current_player else -1
-    
-    # Get all upcoming players:
-    # 1. Players in same set with higher ID
-    same_set = Player.objects.filter(set_no=current_set, id__gt=current_id).order_by('id')
-    
-    # 2. Players in higher sets
-    next_sets = Player.objects.filter(set_no__gt=current_set).order_by('set_no', 'id')
-    
-    # Combine (list concatenation)
-    upcoming = list(same_set) + list(next_sets)
-    
+UPCOMING_MAX_PAGE_SIZE = 100
+
+
+def build_upcoming_page(room, cursor, limit):
+    """One page of the room's upcoming players, `cursor` being a lineup index"""
+    player_ids = lineup_ids(room)
+    start = room.lineup_position + 1 if room.current_player_id else 0
+    cursor = max(start, cursor if cursor is not None else start)  # Already-auctioned players drop off
+    page_ids = player_ids[cursor:cursor + limit]
+    players = Player.objects.in_bulk(page_ids)
+
     result = []
-    for p in upcoming:
+    for player_id in page_ids:
+        p = players.get(player_id)
+        if p is None:
+            continue
         result.append({
             "id": p.id,
             "name": p.name,
@@ -903,8 +1336,45 @@ def get_upcoming_players(request, code):
             "hand": p.hand,
             "bowling": p.bowling
         })
-        
-    return Response(result)
+
+    next_cursor = cursor + limit
+    return {
+        "players": result,
+        "next_cursor": next_cursor if next_cursor < len(player_ids) else None,
+        "remaining": max(0, len(player_ids) - start),
+    }
+
+
+@csrf_exempt
+@api_view(["GET"])
+def get_upcoming_players(request, code):
+    """
+    Get upcoming players (not yet auctioned), a page at a time.
+
+    ?limit=<n>       page size (AUCTION_UPCOMING_PAGE_SIZE by default) - a
+                     small limit such as 3 is a cheap "next up" window
+    ?cursor=<index>  next_cursor from the previous page
+    """
+    try:
+        cursor = int(request.GET["cursor"]) if request.GET.get("cursor") else None
+        limit = int(request.GET.get("limit", settings.AUCTION_UPCOMING_PAGE_SIZE))
+    except ValueError:
+        return Response({"error": "Invalid cursor/limit value"}, status=400)
+    limit = min(max(limit, 1), UPCOMING_MAX_PAGE_SIZE)
+
+    entry = load_room_snapshot(code)
+    if entry is None:
+        return Response({"error": "Invalid room code"}, status=404)
+
+    # ✅ Pages are cached per lineup position - served without SQL until the lot moves on
+    position = entry["state"]["lineup_position"]
+    page = room_cache.get_upcoming_page(code, position, cursor, limit)
+    if page is None:
+        room = Room.objects.get(code=code)
+        page = build_upcoming_page(room, cursor, limit)
+        position = room.lineup_position if room.current_player_id else None
+        room_cache.set_upcoming_page(code, position, cursor, limit, page)
+    return Response(page)
 
 @api_view(['GET'])
 def get_unsold_players(request, code):
@@ -0,0 +1,118 @@
+"""
+WebSocket bidding channel: ws://<host>/ws/room/<code>/
+
+Server -> client: every room event as a JSON frame {"id", "event", "data"}
+(same events as the SSE stream; ?last_event_id= resumes after a reconnect).
+
+Client -> server:
+    {"action": "bid", "team": "MI", "amount": 220, "ref": <optional echo>,
+     "key": <optional idempotency key>}
+("amount" may be left out to bid the next step of the ladder), answered with {"event": "bid_result", "status": 200, "data": {...}, "ref": ...}.
+Bids go through the same rate limit and duplicate check as the HTTP
+endpoints (services/request_guard.py); a repeated key or fingerprint gets
+the stored result back with "replayed": true.
+
+This is a raw ASGI app (routed from auction_web/asgi.py), so a bid skips
+the DRF request/response cycle and the middleware stack entirely.
+"""
+
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from .services.broadcast import get_broadcast
+from .services.db_thread import run_db
+from .services.request_guard import request_key, run_guarded
+from .services.room_events import follow_events
+from .views import room_exists, submit_bid
+
+ROOM_PATH = re.compile(r"^/ws/room/(?P<code>[^/]+)/?$")
+
+
+def _guarded_bid(code, team, amount, client_key):
+    """submit_bid() behind the HTTP endpoints' guard -> (payload, status, replayed)"""
+    if amount is None:
+        endpoint, parts = "bid_next", None
+    else:
+        endpoint, parts = "place_bid", (code, team, amount)
+    key, ttl = request_key(endpoint, code, client_key, parts)
+    return run_guarded(
+        endpoint, code, team or "host", key, ttl,
+        lambda: submit_bid(code, team, amount),
+    )
+
+
+async def _send_json(send, message):
+    await send({"type": "websocket.send", "text": json.dumps(message, default=str)})
+
+
+async def _push_events(send, code, last_event_id):
+    """Forward room events to the socket until cancelled"""
+    events = follow_events(code, last_event_id)
+    try:
+        async for event in events:
+            if event:
+                await _send_json(send, event)
+    finally:
+        await events.aclose()
+
+
+async def _handle_message(send, code, text):
+    try:
+        message = json.loads(text)
+    except (TypeError, ValueError):
+        await _send_json(send, {"event": "error", "data": {"error": "Invalid JSON"}})
+        return
+
+    if not isinstance(message, dict):
+        await _send_json(send, {"event": "error", "data": {"error": "Expected a JSON object"}})
+        return
+
+    if message.get("action") != "bid":
+        await _send_json(send, {"event": "error", "data": {"error": "Unknown action"}})
+        return
+
+    payload, status, replayed = await run_db(
+        _guarded_bid, code, message.get("team"), message.get("amount"), message.get("key")
+    )
+    result = {
+        "event": "bid_result",
+        "status": status,
+        "data": payload,
+        "ref": message.get("ref"),
+    }
+    if replayed:
+        result["replayed"] = True
+    await _send_json(send, result)
+
+
+async def room_socket(scope, receive, send):
+    """ASGI app for one room WebSocket connection"""
+    match = ROOM_PATH.match(scope["path"])
+
+    connect = await receive()
+    if connect["type"] != "websocket.connect":
+        return
+
+    code = match.group("code") if match else None
+    if not code or not await run_db(room_exists, code):
+        await send({"type": "websocket.close", "code": 4404})
+        return
+
+    get_broadcast()  # Start listening for events from other workers
+    await send({"type": "websocket.accept"})
+
+    query = parse_qs(scope.get("query_string", b"").decode())
+    last_event_id = query.get("last_event_id", [None])[0]
+    pusher = asyncio.create_task(_push_events(send, code, last_event_id))
+
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message["type"] == "websocket.receive":
+                await _handle_message(send, code, message.get("text"))
+    finally:
+        pusher.cancel()
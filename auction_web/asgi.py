@@ -2,6 +2,9 @@
 ASGI config for auction_web project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections go to the room bidding socket
+(auction/websocket.py). Room-state long-polls wait in auction/long_poll.py
+before they reach Django, so a waiting client holds no thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +16,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auction_web.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up - it uses the ORM
+from auction.long_poll import hold_long_poll  # noqa: E402
+from auction.websocket import room_socket  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        await room_socket(scope, receive, send)
+    else:
+        scope = await hold_long_poll(scope)
+        await django_application(scope, receive, send)
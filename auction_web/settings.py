@@ -54,8 +54,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'auction.middleware.RequestLatencyMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'auction.middleware.StaticFilesMiddleware',  # WhiteNoise, async-capable
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -140,6 +141,76 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOW_ALL_ORIGINS = os.environ.get('CORS_ALLOW_ALL_ORIGINS', 'True') == 'True'
 CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
 
+# Caches - locmem by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) to share across workers
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'auction-web'),
+    }
+}
+
+# Room-state snapshot cache (alias in CACHES + safety TTL in seconds)
+AUCTION_STATE_CACHE = os.environ.get('AUCTION_STATE_CACHE', 'default')
+AUCTION_STATE_CACHE_TTL = int(os.environ.get('AUCTION_STATE_CACHE_TTL', '30'))
+
+# Long-poll room state: how often a waiting request re-checks the DB for
+# changes made by other worker processes (in-process bids wake it instantly)
+AUCTION_LONG_POLL_RECHECK = float(os.environ.get('AUCTION_LONG_POLL_RECHECK', '2'))
+
+# Poll hints: when this worker's average request latency (ms) goes above
+# the target, the next_poll_ms sent to polling clients is scaled up
+AUCTION_POLL_LATENCY_TARGET_MS = float(os.environ.get('AUCTION_POLL_LATENCY_TARGET_MS', '150'))
+
+# Per-stage bid timings (lookup, validation, overseas count, save, log
+# insert) reported as gauges on /api/metrics/ - off by default
+AUCTION_BID_TIMINGS = os.environ.get('AUCTION_BID_TIMINGS', 'False') == 'True'
+
+# Bid ledger write-behind: buffered bids of a room are written in one batch
+# once this many are waiting or the oldest is this many seconds old (and
+# always when the lot is settled)
+AUCTION_BID_LEDGER_BATCH = int(os.environ.get('AUCTION_BID_LEDGER_BATCH', '20'))
+AUCTION_BID_LEDGER_MAX_AGE = float(os.environ.get('AUCTION_BID_LEDGER_MAX_AGE', '5'))
+
+# Write-request guard for bids / sell / skip: per (room, team) token bucket
+# (requests per second + burst), how long an Idempotency-Key result is kept,
+# and the window in which an identical request without a key is a duplicate
+AUCTION_BID_RATE = float(os.environ.get('AUCTION_BID_RATE', '4'))
+AUCTION_BID_BURST = int(os.environ.get('AUCTION_BID_BURST', '4'))
+AUCTION_IDEMPOTENCY_TTL = int(os.environ.get('AUCTION_IDEMPOTENCY_TTL', '60'))
+AUCTION_DUPLICATE_WINDOW = int(os.environ.get('AUCTION_DUPLICATE_WINDOW', '2'))
+
+# Upcoming players: default page size and how long a cached page lives
+AUCTION_UPCOMING_PAGE_SIZE = int(os.environ.get('AUCTION_UPCOMING_PAGE_SIZE', '20'))
+AUCTION_UPCOMING_CACHE_TTL = int(os.environ.get('AUCTION_UPCOMING_CACHE_TTL', '300'))
+
+# Lobby (active rooms): default page size and cache lifetime in seconds
+AUCTION_LOBBY_PAGE_SIZE = int(os.environ.get('AUCTION_LOBBY_PAGE_SIZE', '50'))
+AUCTION_LOBBY_CACHE_TTL = int(os.environ.get('AUCTION_LOBBY_CACHE_TTL', '5'))
+
+# Room event fan-out (SSE, WebSocket, long-poll wakeups). The in-memory
+# backend only reaches the publishing process; use PostgresBroadcast
+# (LISTEN/NOTIFY) when running more than one worker on Postgres.
+AUCTION_BROADCAST_BACKEND = os.environ.get(
+    'AUCTION_BROADCAST_BACKEND', 'auction.services.broadcast.InMemoryBroadcast'
+)
+
+# Logging - the auction app only logs warnings and errors unless
+# AUCTION_LOG_LEVEL=DEBUG (e.g. to trace every bid decision)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'auction': {
+            'handlers': ['console'],
+            'level': os.environ.get('AUCTION_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
+
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [],
@@ -19,11 +19,12 @@ from django.urls import path, include
 from rest_framework import routers
 from auction.views import (
     PlayerViewSet, TeamViewSet, AuctionViewSet, 
-    create_room, join_room, place_bid, check_qualification, get_room_state,
+    create_room, join_room, place_bid, bid_next, set_proxy_bid, check_qualification, get_room_state,
     start_auction, pause_auction, sell_player, get_active_rooms,
     get_chat_messages, send_chat_message, get_my_team,
     skip_player, end_auction, get_summary, get_upcoming_players, update_room_settings,
-    get_unsold_players, submit_team, get_winner, get_auction_logs
+    get_unsold_players, submit_team, get_winner, get_auction_logs,
+    room_event_stream, get_metrics, get_dashboard
 )
 
 
@@ -41,11 +42,15 @@ urlpatterns = [
     path("api/start-auction/", start_auction),
     path("api/pause-auction/", pause_auction),
     path("api/place-bid/", place_bid),
+    path("api/bid-next/", bid_next),
+    path("api/proxy-bid/", set_proxy_bid),
     path("api/sell-player/", sell_player),
     path("api/skip-player/", skip_player),
     path("api/end-auction/", end_auction),
     path("api/check-qualification/<str:code>/", check_qualification),
     path("api/room-state/<str:code>/", get_room_state),
+    path("api/dashboard/<str:code>/", get_dashboard),
+    path("api/events/<str:code>/", room_event_stream),
     path("api/chat/<str:code>/", get_chat_messages),
     path("api/send-message/", send_chat_message),
     path("api/my-team/<str:code>/<str:team_name>/", get_my_team),
@@ -56,6 +61,7 @@ urlpatterns = [
     path("api/submit-xi/", submit_team),
     path("api/winner/<str:code>/", get_winner),
     path("api/logs/<str:code>/", get_auction_logs),
+    path("api/metrics/", get_metrics),
 ]
 
 